@@ -0,0 +1,225 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 4
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:5001
+
+Worker model
+------------
+Each worker process runs one event loop and serves two kinds of endpoints:
+
+* Native async endpoints (NATIVE_ENDPOINTS, currently the chatbot) run as
+  coroutines on the worker's event loop, inside a Flask request context. While
+  a request waits on OpenRouter it holds no OS thread. Blocking work such as
+  queries, note files and PDF parsing goes to the offload pool
+  (OFFLOAD_WORKERS threads, see utils/offload.py). Iterating a streamed reply
+  also uses a pool thread.
+* Every other route is the normal WSGI app, called on the loop's default
+  thread pool, one thread per in-flight request (min(32, CPUs + 4) by default).
+  Streamed bodies such as note downloads are drained on the offload pool.
+
+So one worker handles as many concurrent chat requests as the LLM limiter
+allows (LLM_MAX_CONCURRENT plus LLM_MAX_QUEUE waiting), while logins and
+downloads keep their own threads. Caches, metrics and the LLM limiter are per
+process; scale with --workers, not threads.
+
+The WSGI entry point (python app.py, or gunicorn "app:create_app()") still
+works. There, Flask runs each async view on a fresh event loop in the request
+thread. Compare the two with benchmark_asgi.py.
+"""
+from app import create_app
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+from werkzeug.wrappers import Response
+import asyncio
+import contextvars
+import io
+import logging
+import sys
+import threading
+from utils import offload
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Async views served natively on the event loop; their handlers must be jwt_required() wrappers
+NATIVE_ENDPOINTS = {'chatbot.chatbot'}
+
+# Streamed chunks buffered ahead of the client; the producer waits when the buffer is full
+STREAM_BUFFER_CHUNKS = 8
+
+_STREAM_END = object()
+
+flask_app = create_app()
+
+def path_info(scope):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope with an already-read body."""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': path_info(scope).encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        key = {'content-length': 'CONTENT_LENGTH', 'content-type': 'CONTENT_TYPE'}.get(name, f"HTTP_{name.upper().replace('-', '_')}")
+        environ[key] = f"{environ[key]},{value.decode('latin1')}" if key in environ and key.startswith('HTTP_') else value.decode('latin1')
+    # The whole body is in hand, also for chunked requests that sent no Content-Length
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ['wsgi.input_terminated'] = True
+    return environ
+
+def native_endpoint(scope):
+    """The matched endpoint and view args when the request is served natively, else None."""
+    adapter = flask_app.url_map.bind('localhost')
+    try:
+        endpoint, view_args = adapter.match(path_info(scope), method=scope['method'])
+    except (HTTPException, RequestRedirect):
+        return None
+    return (endpoint, view_args) if endpoint in NATIVE_ENDPOINTS else None
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def dispatch_native(endpoint, view_args, environ):
+    """
+    Flask's request dispatch (full_dispatch_request inside wsgi_app), awaiting
+    the view: before/after request hooks, error handlers, and handle_exception
+    for errors no handler took.
+    """
+    with flask_app.request_context(environ):
+        try:
+            try:
+                response = flask_app.preprocess_request()
+                if response is None:
+                    verify_jwt_in_request()
+                    view = flask_app.view_functions[endpoint].__wrapped__
+                    response = await view(**view_args)
+            except Exception as e:
+                response = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(response)
+        except Exception as e:
+            response = flask_app.handle_exception(e)
+        if not response.is_streamed:
+            response.get_data()  # buffer while the request context is active
+        return response
+
+async def dispatch_wsgi(environ, context):
+    """
+    Call the WSGI app on the loop's default thread pool, inside ``context``.
+    Not asgiref's WsgiToAsgi: its thread-sensitive executors leak between
+    requests on a shared loop and fail with "CurrentThreadExecutor already
+    quit or is broken".
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, context.run, Response.from_app, flask_app, environ)
+
+async def send_response(response, send, context):
+    """
+    Send a response and close it, also when sending fails, so call_on_close
+    hooks (LLM limiter release, request teardown) run. Streamed bodies are
+    iterated and closed in ``context``, the context the response was built in:
+    stream_with_context generators hold the request context pushed there.
+    """
+    streaming = False
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers.items()],
+        })
+        if not response.is_streamed:
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+            return
+        streaming = True
+    finally:
+        if not streaming:
+            context.run(response.close)
+
+    # Streamed bodies are sync generators; drain one on a pool thread, which also closes it.
+    # The bounded queue keeps the generator at most STREAM_BUFFER_CHUNKS ahead of the client.
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    stopped = threading.Event()
+
+    def put(chunk):
+        asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop).result()
+
+    def drain():
+        try:
+            for chunk in response.iter_encoded():
+                put(chunk)
+                if stopped.is_set():
+                    break  # the client is gone; closing the generator cancels the upstream call
+        except Exception as e:
+            logger.error(f"Streamed response failed: {str(e)}")
+        finally:
+            response.close()
+            put(_STREAM_END)
+
+    offload.submit(context.run, drain)
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is _STREAM_END:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        stopped.set()
+        # Nobody reads past this point; empty the buffer so a blocked put in drain returns
+        while not chunks.empty():
+            chunks.get_nowait()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    body = await read_body(receive)
+    if body is None:
+        return  # client went away before sending the body
+    environ = build_environ(scope, body)
+    native = native_endpoint(scope)
+    if native:
+        response = await dispatch_native(*native, environ)
+        context = contextvars.copy_context()
+    else:
+        context = contextvars.Context()
+        response = await dispatch_wsgi(environ, context)
+    await send_response(response, send, context)
@@ -0,0 +1,119 @@
+from app import create_app
+from models import Notes
+from load_test_chat import summarize
+from flask_jwt_extended import create_access_token
+import aiohttp
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ('chat', 'download', 'mixed')
+
+def prepare(department, semester, users):
+    """
+    One student JWT per client (the LLM limiter caps requests per user) and a
+    note filename those students may download (None if the scope has no notes).
+    """
+    app = create_app()
+
+    with app.app_context():
+        tokens = [
+            create_access_token(
+                identity=f"benchmark{i:03d}",
+                additional_claims={"role": "student", "departmentcode": department, "semester": semester}
+            )
+            for i in range(users)
+        ]
+        note = Notes.query.filter_by(departmentcode=department, semester=semester).order_by(Notes.id).first()
+        return tokens, note.filename if note else None
+
+async def client(session, base_url, kind, token, note_filename, counter, deadline, results):
+    headers = {'Authorization': f"Bearer {token}"}
+    while time.monotonic() < deadline:
+        if kind == 'chat':
+            # Unique, non-campus questions so neither the response cache nor a local answer short-circuits
+            request = session.post(
+                f"{base_url}/api/chatbot/chat",
+                headers=dict(headers, **{'X-Chat-Cache': 'bypass'}),
+                json={'message': f"Explain recursion with example {next(counter)}"}
+            )
+        else:
+            request = session.get(f"{base_url}/api/students/download/notes/{note_filename}", headers=headers)
+        start_time = time.perf_counter()
+        try:
+            async with request as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"{kind} request failed: {str(e)}")
+            status = 'error'
+        results.append((kind, status, time.perf_counter() - start_time))
+
+async def run_scenario(base_url, scenario, options, tokens, note_filename):
+    if scenario == 'chat':
+        kinds = ['chat'] * options.concurrency
+    elif scenario == 'download':
+        kinds = ['download'] * options.concurrency
+    else:
+        kinds = ['chat', 'download'] * (options.concurrency // 2)
+
+    results = []
+    counter = itertools.count()
+    timeout = aiohttp.ClientTimeout(total=options.timeout)
+    async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+        start_time = time.monotonic()
+        deadline = start_time + options.duration
+        await asyncio.gather(*(client(session, base_url, kind, token, note_filename, counter, deadline, results)
+                               for kind, token in zip(kinds, tokens)))
+        elapsed = time.monotonic() - start_time
+    return summarize(results, elapsed)
+
+async def run(options):
+    tokens, note_filename = prepare(options.department, options.semester, options.concurrency)
+    scenarios = options.scenarios
+    if note_filename is None and any(scenario != 'chat' for scenario in scenarios):
+        logger.warning(f"No notes for {options.semester} {options.department}; running the chat scenario only")
+        scenarios = ['chat']
+
+    report = {}
+    for label, base_url in (('wsgi', options.wsgi_url), ('asgi', options.asgi_url)):
+        if not base_url:
+            continue
+        for scenario in scenarios:
+            logger.info(f"{label}: {scenario} with {options.concurrency} clients for {options.duration}s against {base_url}")
+            report.setdefault(label, {})[scenario] = await run_scenario(base_url.rstrip('/'), scenario, options, tokens, note_filename)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Compare the WSGI and ASGI deployments on the chatbot and download endpoints. '
+                    'Start both servers against the same database, with OPENROUTER_BASE_URL pointing at mock_openrouter.py.'
+    )
+    parser.add_argument('--wsgi-url', help='Backend served by the WSGI entry point (e.g. gunicorn "app:create_app()")')
+    parser.add_argument('--asgi-url', help='Backend served by asgi.py (e.g. uvicorn asgi:app)')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                        help='chat, download, or mixed (half the clients each, showing download latency under chat load)')
+    parser.add_argument('--concurrency', type=int, default=50, help='Simultaneous clients per scenario; chat clients beyond LLM_MAX_CONCURRENT + LLM_MAX_QUEUE get 429s')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per scenario')
+    parser.add_argument('--department', default='CS')
+    parser.add_argument('--semester', default='S1')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    if not args.wsgi_url and not args.asgi_url:
+        parser.error('pass --wsgi-url and/or --asgi-url')
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.output}")
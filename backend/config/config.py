@@ -6,4 +6,8 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DB')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = os.getenv("SECRET_KEY")    
\ No newline at end of file
+    SECRET_KEY = os.getenv("SECRET_KEY")
+
+    # How downloads are delivered: 'direct', 'x-accel-redirect' (nginx) or 'x-sendfile'
+    FILE_DELIVERY_MODE = os.getenv("FILE_DELIVERY_MODE", "direct")
+    FILE_DELIVERY_ACCEL_PREFIX = os.getenv("FILE_DELIVERY_ACCEL_PREFIX", "/protected_uploads")
@@ -0,0 +1,78 @@
+from app import create_app, db
+from models import User, Subject, Timetable, Notes, Assignment, Requests
+from sqlalchemy import text
+import argparse
+import json
+import logging
+import sys
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Sample values used to bind the hot-query predicates
+SAMPLE_DEPARTMENT = 'CS'
+SAMPLE_SEMESTER = 'S1'
+SAMPLE_USER = 'admin001'
+
+def hot_queries():
+    """The department/semester and per-user lookups behind the busiest routes."""
+    return {
+        'notes_by_department_semester': Notes.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, semester=SAMPLE_SEMESTER),
+        'notes_catalog_lookup': Notes.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, semester=SAMPLE_SEMESTER, subject_name='Maths', module_number=1),
+        'timetables_by_department_semester': Timetable.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, semester=SAMPLE_SEMESTER),
+        'subjects_by_department_semester': Subject.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, semester=SAMPLE_SEMESTER),
+        'teachers_by_department': User.query.filter(User.departmentcode == SAMPLE_DEPARTMENT, User.role.in_(['staff', 'hod'])),
+        'students_by_department': User.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, role='student'),
+        'assignments_by_submitter': Assignment.query.filter_by(departmentcode=SAMPLE_DEPARTMENT, submitted_by=SAMPLE_USER),
+        'assignments_by_instructor': Assignment.query.filter_by(instructor_id=SAMPLE_USER),
+        'requests_by_student_status': Requests.query.filter_by(admission_number=SAMPLE_USER, status='pending'),
+    }
+
+def explain(query):
+    """Runs EXPLAIN for a query and returns the plan rows as dictionaries."""
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    result = db.session.execute(text(prefix + sql))
+    return sql, [dict(row._mapping) for row in result]
+
+def is_full_scan(dialect_name, plan):
+    """True when a plan reads the table without using an index."""
+    if dialect_name == 'sqlite':
+        return any(row['detail'].startswith('SCAN') and 'INDEX' not in row['detail'] for row in plan)
+    return any(row.get('type') == 'ALL' for row in plan)
+
+def record_plans(output=None):
+    app = create_app()
+
+    with app.app_context():
+        dialect_name = db.engine.dialect.name
+        report = {}
+        full_scans = []
+        for name, query in hot_queries().items():
+            sql, plan = explain(query)
+            full_scan = is_full_scan(dialect_name, plan)
+            report[name] = {'sql': sql, 'plan': plan, 'full_scan': full_scan}
+            if full_scan:
+                full_scans.append(name)
+                logger.warning(f"{name} runs as a full table scan")
+            else:
+                logger.info(f"{name} uses an index")
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            logger.info(f"EXPLAIN plans written to {output}")
+        return full_scans
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Record EXPLAIN plans for the hot queries.')
+    parser.add_argument('--output', help='Write the plans to this JSON file')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 if any query is a full scan')
+    args = parser.parse_args()
+
+    full_scans = record_plans(args.output)
+    if args.check and full_scans:
+        logger.error(f"Full table scans: {', '.join(full_scans)}")
+        sys.exit(1)
@@ -0,0 +1,182 @@
+from app import create_app
+from models import Notes
+from utils.blob_store import stored_file
+from flask_jwt_extended import create_access_token
+import aiohttp
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NOTES_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads/notes')
+
+TEXT_QUESTIONS = [
+    "Who is the HOD of {department}?",
+    "List the staff in {department}",
+    "What subjects are taught in {semester}?",
+    "When is the next class in the {semester} timetable?",
+    "How many students are in {department}?",
+    "Hi, how are you?",
+    "Explain recursion in simple words",
+]
+NOTES_QUESTIONS = [
+    "{semester} notes on {subject} module {module}",
+    "Explain {subject} module {module} notes",
+    "Summarise the {subject} notes",
+]
+
+def prepare(department, semester, users):
+    """JWTs for simulated students plus the notes catalog and a sample PDF to ask about."""
+    app = create_app()
+
+    with app.app_context():
+        tokens = [
+            create_access_token(
+                identity=f"loadtest{i:03d}",
+                additional_claims={"role": "student", "departmentcode": department, "semester": semester}
+            )
+            for i in range(users)
+        ]
+        catalog = [
+            (subject_name, module_number)
+            for subject_name, module_number in Notes.query.filter(
+                Notes.departmentcode == department, Notes.subject_name.isnot(None)
+            ).with_entities(Notes.subject_name, Notes.module_number).distinct()
+        ]
+        sample_pdf = None
+        for note in Notes.query.filter_by(departmentcode=department).limit(20):
+            folder, name = stored_file(NOTES_FOLDER, note.filename, note.content_hash)
+            if os.path.exists(os.path.join(folder, name)):
+                sample_pdf = os.path.join(folder, name)
+                break
+    return tokens, catalog or [('Maths', 1)], sample_pdf
+
+def parse_mix(mix):
+    """'text=6,notes=3,pdf=1' -> {'text': 6.0, 'notes': 3.0, 'pdf': 1.0}"""
+    weights = {}
+    for part in mix.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('text', 'notes', 'pdf'):
+            raise ValueError(f"Unknown request kind in mix: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+def build_request(kind, department, semester, catalog, pdf_data):
+    """Form data (for aiohttp) or a JSON body for one chat request of the given kind."""
+    if kind == 'pdf':
+        form = aiohttp.FormData()
+        form.add_field('message', 'Summarise this document')
+        form.add_field('file', pdf_data, filename='load_test.pdf', content_type='application/pdf')
+        return {'data': form}
+    if kind == 'notes':
+        subject, module = random.choice(catalog)
+        message = random.choice(NOTES_QUESTIONS).format(semester=semester, subject=subject.replace('_', ' '), module=module or 1)
+    else:
+        message = random.choice(TEXT_QUESTIONS).format(department=department, semester=semester)
+    return {'json': {'message': message}}
+
+async def worker(session, url, deadline, options, tokens, catalog, pdf_data, results):
+    kinds, weights = zip(*options.weights.items())
+    while time.monotonic() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        headers = {'Authorization': f"Bearer {random.choice(tokens)}"}
+        if options.bypass_cache:
+            headers['X-Chat-Cache'] = 'bypass'
+        start_time = time.perf_counter()
+        try:
+            async with session.post(url, headers=headers, **build_request(kind, options.department, options.semester, catalog, pdf_data)) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"{kind} request failed: {str(e)}")
+            status = 'error'
+        results.append((kind, status, time.perf_counter() - start_time))
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def summarize(results, elapsed):
+    """Latency percentiles (successful requests), status counts and throughput per kind and overall."""
+    by_kind = defaultdict(list)
+    for result in results:
+        by_kind[result[0]].append(result)
+        by_kind['all'].append(result)
+
+    report = {}
+    for kind, rows in sorted(by_kind.items()):
+        latencies = sorted(latency for _, status, latency in rows if status == 200)
+        report[kind] = {
+            'requests': len(rows),
+            'statuses': dict(Counter(str(status) for _, status, _ in rows)),
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None
+        }
+    return report
+
+async def run(options):
+    tokens, catalog, sample_pdf = prepare(options.department, options.semester, options.users)
+    pdf_path = options.pdf or sample_pdf
+    pdf_data = None
+    if options.weights.get('pdf'):
+        if pdf_path:
+            with open(pdf_path, 'rb') as f:
+                pdf_data = f.read()
+        else:
+            logger.warning("No PDF available (pass --pdf); leaving PDF uploads out of the mix")
+            del options.weights['pdf']
+
+    url = f"{options.base_url.rstrip('/')}/api/chatbot/chat"
+    results = []
+    logger.info(f"Driving {url} with {options.concurrency} clients for {options.duration}s, mix {options.weights}")
+    timeout = aiohttp.ClientTimeout(total=options.timeout)
+    async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=options.concurrency)) as session:
+        start_time = time.monotonic()
+        deadline = start_time + options.duration
+        await asyncio.gather(*(
+            worker(session, url, deadline, options, tokens, catalog, pdf_data, results)
+            for _ in range(options.concurrency)
+        ))
+        elapsed = time.monotonic() - start_time
+    return summarize(results, elapsed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Load-test /api/chatbot/chat with a mix of text, notes and PDF-upload questions. '
+                    'Point the backend at mock_openrouter.py to avoid API costs.'
+    )
+    parser.add_argument('--base-url', default='http://127.0.0.1:5001', help='Backend to drive')
+    parser.add_argument('--concurrency', type=int, default=10, help='Simultaneous clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--mix', default='text=6,notes=3,pdf=1', help='Relative weights of request kinds')
+    parser.add_argument('--users', type=int, default=20, help='Distinct simulated students')
+    parser.add_argument('--department', default='CS')
+    parser.add_argument('--semester', default='S1')
+    parser.add_argument('--pdf', help='PDF to upload (defaults to a stored note of the department)')
+    parser.add_argument('--bypass-cache', action='store_true', help='Send X-Chat-Cache: bypass with every request')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    try:
+        args.weights = parse_mix(args.mix)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(2)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.output}")
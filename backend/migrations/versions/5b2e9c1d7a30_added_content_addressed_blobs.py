@@ -0,0 +1,43 @@
+"""Added content-addressed blobs for uploads
+
+Revision ID: 5b2e9c1d7a30
+Revises: 0401fa693df5
+Create Date: 2026-10-18 03:20:41.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9c1d7a30'
+down_revision = '0401fa693df5'
+branch_labels = None
+depends_on = None
+
+UPLOAD_TABLES = ('notes', 'timetables', 'assignments', 'requests')
+
+
+def upgrade():
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    for table in UPLOAD_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+            batch_op.create_foreign_key(f'fk_{table}_content_hash_blobs', 'blobs', ['content_hash'], ['sha256'])
+
+
+def downgrade():
+    # Files uploaded after the upgrade live only under uploads/blobs; they are
+    # not copied back to the per-type folders.
+    for table in reversed(UPLOAD_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_content_hash_blobs', type_='foreignkey')
+            batch_op.drop_column('content_hash')
+
+    op.drop_table('blobs')
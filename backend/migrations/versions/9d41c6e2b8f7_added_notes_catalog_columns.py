@@ -0,0 +1,50 @@
+"""Added subject and module catalog columns to notes
+
+Revision ID: 9d41c6e2b8f7
+Revises: 5b2e9c1d7a30
+Create Date: 2026-10-18 03:52:07.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import re
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41c6e2b8f7'
+down_revision = '5b2e9c1d7a30'
+branch_labels = None
+depends_on = None
+
+# Filenames written by the notes upload routes: {semester}_{subject}_Module{n}_{YYYYmmdd_HHMMSS}.pdf
+NOTES_FILENAME = re.compile(r'^S\d+_(?P<subject>.+)_Module(?P<module>\d+)_\d{8}_\d{6}\.pdf$', re.IGNORECASE)
+
+
+def upgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('subject_name', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('module_number', sa.Integer(), nullable=True))
+
+    notes = sa.table('notes', sa.column('id', sa.Integer), sa.column('filename', sa.String),
+                     sa.column('subject_name', sa.String), sa.column('module_number', sa.Integer))
+    connection = op.get_bind()
+    for note_id, filename in connection.execute(sa.select(notes.c.id, notes.c.filename)).fetchall():
+        match = NOTES_FILENAME.match(filename or '')
+        if match:
+            connection.execute(
+                notes.update().where(notes.c.id == note_id)
+                .values(subject_name=match.group('subject')[:100], module_number=int(match.group('module')))
+            )
+
+    # The catalog index starts with (departmentcode, semester), so it replaces the narrower one
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.create_index('ix_notes_catalog', ['departmentcode', 'semester', 'subject_name', 'module_number'], unique=False)
+        batch_op.drop_index('ix_notes_departmentcode_semester')
+
+
+def downgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.create_index('ix_notes_departmentcode_semester', ['departmentcode', 'semester'], unique=False)
+        batch_op.drop_index('ix_notes_catalog')
+        batch_op.drop_column('module_number')
+        batch_op.drop_column('subject_name')
@@ -0,0 +1,78 @@
+"""Added composite indexes for hot queries
+
+Revision ID: c67f8c7f421a
+Revises: f4a9ce34628c
+Create Date: 2026-10-18 02:43:04.575960
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c67f8c7f421a'
+down_revision = 'f4a9ce34628c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_departmentcode_role', ['departmentcode', 'role'], unique=False)
+
+    with op.batch_alter_table('subjects', schema=None) as batch_op:
+        batch_op.create_index('ix_subjects_departmentcode_semester', ['departmentcode', 'semester'], unique=False)
+
+    with op.batch_alter_table('timetables', schema=None) as batch_op:
+        batch_op.create_index('ix_timetables_departmentcode_semester', ['departmentcode', 'semester'], unique=False)
+
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.create_index('ix_notes_departmentcode_semester', ['departmentcode', 'semester'], unique=False)
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_assignments_submitted_by_departmentcode', ['submitted_by', 'departmentcode'], unique=False)
+        batch_op.create_index('ix_assignments_instructor_id_submission_filename', ['instructor_id', 'submission_filename'], unique=False)
+
+    with op.batch_alter_table('requests', schema=None) as batch_op:
+        batch_op.create_index('ix_requests_admission_number_status', ['admission_number', 'status'], unique=False)
+
+
+def restore_foreign_key_index(batch_op, table, column):
+    """
+    On MySQL, InnoDB backed each unnamed foreign key with an implicit index
+    named after its column, and silently dropped it once a composite index
+    leading with that column existed. The composite cannot be dropped while the
+    foreign key relies on it, so put the implicit index back under its original
+    name first. Other databases never had it.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name == 'mysql' and column not in {index['name'] for index in sa.inspect(bind).get_indexes(table)}:
+        batch_op.create_index(column, [column], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('requests', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'requests', 'admission_number')
+        batch_op.drop_index('ix_requests_admission_number_status')
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'assignments', 'instructor_id')
+        restore_foreign_key_index(batch_op, 'assignments', 'submitted_by')
+        batch_op.drop_index('ix_assignments_instructor_id_submission_filename')
+        batch_op.drop_index('ix_assignments_submitted_by_departmentcode')
+
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'notes', 'departmentcode')
+        batch_op.drop_index('ix_notes_departmentcode_semester')
+
+    with op.batch_alter_table('timetables', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'timetables', 'departmentcode')
+        batch_op.drop_index('ix_timetables_departmentcode_semester')
+
+    with op.batch_alter_table('subjects', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'subjects', 'departmentcode')
+        batch_op.drop_index('ix_subjects_departmentcode_semester')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        restore_foreign_key_index(batch_op, 'users', 'departmentcode')
+        batch_op.drop_index('ix_users_departmentcode_role')
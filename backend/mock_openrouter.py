@@ -0,0 +1,107 @@
+from aiohttp import web
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Canned reply; its words are streamed back as tokens
+REPLY = (
+    "1. Summary: this is a canned answer from the local OpenRouter stand-in, returned so the chatbot "
+    "can be exercised and benchmarked without calling the paid API.\n"
+    "2. Key topics: load testing, latency, streaming responses and error handling."
+)
+
+def reply_tokens(max_tokens):
+    words = REPLY.split(' ')
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words[:max_tokens])]
+
+def usage(payload, completion_tokens):
+    prompt_tokens = sum(len(str(message.get('content', ''))) for message in payload.get('messages', [])) // 4
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+def error_response():
+    status = random.choice([429, 500, 502])
+    logger.info(f"Injecting a {status} error")
+    return web.json_response({'error': {'code': status, 'message': 'Injected error from mock_openrouter'}}, status=status)
+
+async def chat_completions(request):
+    """Minimal /chat/completions: JSON or SSE, with injected latency, token rate and errors."""
+    settings = request.app['settings']
+    payload = await request.json()
+    model = payload.get('model', 'mock/model')
+    tokens = reply_tokens(int(payload.get('max_tokens') or 500))
+    completion_id = f"gen-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    await asyncio.sleep(max(0.0, random.gauss(settings.latency, settings.jitter)))
+    if random.random() < settings.error_rate:
+        return error_response()
+
+    if not payload.get('stream'):
+        await asyncio.sleep(len(tokens) / settings.tokens_per_second)
+        return web.json_response({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': ''.join(tokens)}}],
+            'usage': usage(payload, len(tokens))
+        })
+
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    await response.write(b': OPENROUTER PROCESSING\n\n')
+    for token in tokens:
+        await asyncio.sleep(1 / settings.tokens_per_second)
+        chunk = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+        }
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+    final = {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': created,
+        'model': model,
+        'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+        'usage': usage(payload, len(tokens))
+    }
+    await response.write(f"data: {json.dumps(final)}\n\n".encode('utf-8'))
+    await response.write(b'data: [DONE]\n\n')
+    return response
+
+def create_mock_app(settings):
+    app = web.Application()
+    app['settings'] = settings
+    app.router.add_post('/api/v1/chat/completions', chat_completions)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for the OpenRouter chat completions API. '
+                    'Run the backend with OPENROUTER_BASE_URL=http://HOST:PORT/api/v1 to use it.'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.8, help='Mean seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Standard deviation of the latency, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 429/5xx error')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='Rate at which reply tokens are generated')
+    args = parser.parse_args()
+
+    logger.info(f"Mock OpenRouter at http://{args.host}:{args.port}/api/v1 (latency {args.latency}s, error rate {args.error_rate})")
+    web.run_app(create_mock_app(args), host=args.host, port=args.port, print=None)
@@ -1,6 +1,7 @@
 from database import db
 from datetime import datetime
 from sqlalchemy import Enum
+from sqlalchemy.orm import joinedload
 import bcrypt
 
 # User Model (unchanged)
@@ -16,6 +17,11 @@ class User(db.Model):
     semester = db.Column(db.String(2), nullable=True)  # e.g., 'S1', 'S2', nullable for non-students
     phone_number = db.Column(db.String(15), nullable=True)
     batch = db.Column(db.String(10), nullable=True)  # e.g., '2023', nullable for non-students
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_users_departmentcode_role', 'departmentcode', 'role'),
+    )
 
     def set_password(self, password):
         """Hash and set the user's password."""
@@ -62,10 +68,22 @@ class Subject(db.Model):
     credits = db.Column(db.Integer, nullable=False)  # e.g., 4
     departmentcode = db.Column(db.String(10), db.ForeignKey('departments.departmentcode'), nullable=False)
     instructor_id = db.Column(db.String(50), db.ForeignKey('users.admission_number'), nullable=True)  # New column for instructor
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-    def to_dict(self):
-        """Convert subject object to a dictionary."""
-        return {
+    instructor = db.relationship('User', foreign_keys=[instructor_id])
+
+    __table_args__ = (
+        db.Index('ix_subjects_departmentcode_semester', 'departmentcode', 'semester'),
+    )
+
+    @classmethod
+    def with_instructor(cls):
+        """Query subjects with the instructor's username joined-loaded in the same query."""
+        return cls.query.options(joinedload(cls.instructor).load_only(User.username))
+
+    def to_dict(self, include_instructor=False):
+        """Convert subject object to a dictionary, optionally with the instructor's name."""
+        data = {
             'id': self.id,
             'semester': self.semester,
             'subject_code': self.subject_code,
@@ -74,6 +92,17 @@ class Subject(db.Model):
             'departmentcode': self.departmentcode,
             'instructor_id': self.instructor_id
         }
+        if include_instructor:
+            data['instructor_name'] = self.instructor.username if self.instructor else 'Not Assigned'
+        return data
+
+# Blob Model: one row per stored upload content, shared by every row that uploaded the same bytes
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    sha256 = db.Column(db.String(64), primary_key=True)  # hex digest, also the file name under uploads/blobs
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)  # rows currently referencing this blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
 # Timetable Model (unchanged)
 class Timetable(db.Model):
@@ -83,6 +112,11 @@ class Timetable(db.Model):
     filename = db.Column(db.String(255), nullable=False)  # e.g., 'S1_CS101_Module1_20231010.xlsx'
     departmentcode = db.Column(db.String(10), db.ForeignKey('departments.departmentcode'), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), nullable=True)  # NULL for files stored before blobs
+
+    __table_args__ = (
+        db.Index('ix_timetables_departmentcode_semester', 'departmentcode', 'semester'),
+    )
 
     def to_dict(self):
         """Convert timetable object to a dictionary."""
@@ -91,7 +125,8 @@ class Timetable(db.Model):
             'semester': self.semester,
             'filename': self.filename,
             'departmentcode': self.departmentcode,
-            'uploaded_at': self.uploaded_at.isoformat()
+            'uploaded_at': self.uploaded_at.isoformat(),
+            'content_hash': self.content_hash
         }
 
 # Notes Model (unchanged)
@@ -102,6 +137,13 @@ class Notes(db.Model):
     filename = db.Column(db.String(255), nullable=False)  # e.g., 'S1_CS101_Module1_20231010.pdf'
     departmentcode = db.Column(db.String(10), db.ForeignKey('departments.departmentcode'), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), nullable=True)  # NULL for files stored before blobs
+    subject_name = db.Column(db.String(100), nullable=True)  # catalog fields, set at upload time
+    module_number = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_notes_catalog', 'departmentcode', 'semester', 'subject_name', 'module_number'),
+    )
 
     def to_dict(self):
         """Convert notes object to a dictionary."""
@@ -110,7 +152,10 @@ class Notes(db.Model):
             'semester': self.semester,
             'filename': self.filename,
             'departmentcode': self.departmentcode,
-            'uploaded_at': self.uploaded_at.isoformat()
+            'uploaded_at': self.uploaded_at.isoformat(),
+            'content_hash': self.content_hash,
+            'subject_name': self.subject_name,
+            'module_number': self.module_number
         }
 
 # Announcement Model (General) (unchanged)
@@ -172,6 +217,12 @@ class Assignment(db.Model):
     submission_filename = db.Column(db.String(255), nullable=True)
     submitted_by = db.Column(db.String(50), db.ForeignKey('users.admission_number'), nullable=True)
     submitted_at = db.Column(db.DateTime, nullable=True)
+    content_hash = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), nullable=True)  # blob of the submitted file
+
+    __table_args__ = (
+        db.Index('ix_assignments_submitted_by_departmentcode', 'submitted_by', 'departmentcode'),
+        db.Index('ix_assignments_instructor_id_submission_filename', 'instructor_id', 'submission_filename'),
+    )
 
     def to_dict(self):
         return {
@@ -184,7 +235,8 @@ class Assignment(db.Model):
             'created_at': self.created_at.isoformat(),
             'submission_filename': self.submission_filename,
             'submitted_by': self.submitted_by,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'content_hash': self.content_hash
         }
 
 # New Requests Model
@@ -196,6 +248,12 @@ class Requests(db.Model):
     status = db.Column(Enum('pending', 'approved', 'rejected', name='request_status'), default='pending', nullable=False)
     admission_number = db.Column(db.String(50), db.ForeignKey('users.admission_number'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), nullable=True)  # NULL for files stored before blobs
+
+    __table_args__ = (
+        db.Index('ix_requests_admission_number_status', 'admission_number', 'status'),
+    )
 
     def to_dict(self):
         """Convert request object to a dictionary."""
@@ -205,5 +263,6 @@ class Requests(db.Model):
             'filename': self.filename,
             'status': self.status,
             'admission_number': self.admission_number,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'content_hash': self.content_hash
         }
\ No newline at end of file
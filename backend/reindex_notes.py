@@ -0,0 +1,50 @@
+from app import create_app, db
+from models import Notes
+from utils import notes_index
+from utils.blob_store import stored_file
+import argparse
+import logging
+import os
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NOTES_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads/notes')
+
+def reindex(clear=False):
+    """Index every note whose file is on disk; unchanged blobs are skipped unless the index is cleared."""
+    app = create_app()
+
+    with app.app_context():
+        if clear:
+            notes_index.clear()
+            logger.info("Cleared the notes index")
+
+        indexed = skipped = missing = 0
+        for note in Notes.query.order_by(Notes.id).yield_per(500):
+            folder, name = stored_file(NOTES_FOLDER, note.filename, note.content_hash)
+            file_path = os.path.join(folder, name)
+            if not os.path.exists(file_path):
+                logger.warning(f"Note {note.id} file {note.filename} is missing, skipping")
+                missing += 1
+                continue
+            try:
+                if notes_index.index_note(note.id, file_path, note.departmentcode, note.semester, note.filename, note.content_hash) is None:
+                    skipped += 1
+                else:
+                    indexed += 1
+            except Exception as e:
+                logger.error(f"Failed to index note {note.id}: {str(e)}")
+
+        note_ids = {note_id for (note_id,) in db.session.query(Notes.id)}
+        stale = sorted(notes_index.indexed_note_ids() - note_ids)
+        notes_index.remove_notes(stale)
+        logger.info(f"Indexed {indexed} notes, {skipped} unchanged, {missing} missing, {len(stale)} stale entries removed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild the full-text index over uploaded notes.')
+    parser.add_argument('--clear', action='store_true', help='Drop the existing index before rebuilding')
+    args = parser.parse_args()
+
+    reindex(args.clear)
@@ -1,9 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import and_, insert, or_, select
 from database import db
 from models import User, Subject, Department, Timetable, Notes, Assignment, Requests
+from utils.pagination import apply_filters, paginate, page_response, pagination_requested
+from utils.file_cleanup import schedule_removal
+from utils.blob_store import release
+from utils import metrics, notes_index, pdf_text_cache
+from utils.response_cache import chat_cache
+from utils.llm_limiter import llm_limiter
 from functools import wraps
+from concurrent.futures import ProcessPoolExecutor
 import bcrypt
+import csv
+import io
+import itertools
+import json
 import re
 import logging
 import os
@@ -20,6 +32,25 @@ REQUESTS_FOLDER = os.path.join(os.path.dirname(__file__), '../uploads/requests')
 os.makedirs(ASSIGNMENTS_FOLDER, exist_ok=True)
 os.makedirs(REQUESTS_FOLDER, exist_ok=True)
 
+# Bulk import/delete settings
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 20000))
+BULK_IMPORT_WORKERS = int(os.getenv('BULK_IMPORT_WORKERS', os.cpu_count() or 1))
+BULK_CHUNK_SIZE = 500
+JSONL_MIMETYPES = ['application/jsonl', 'application/x-jsonl', 'application/x-ndjson', 'application/ndjson']
+
+VALID_ROLES = ['hod', 'staff', 'student']
+VALID_SEMESTERS = [f'S{i}' for i in range(1, 9)]
+
+# Query-string filters accepted by the admin list endpoints
+USER_FILTERS = ['role', 'departmentcode', 'semester', 'batch']
+SCOPE_FILTERS = ['departmentcode', 'semester']
+
+# Roles that make up each group in the users-by-department listing
+USER_GROUPS = {
+    'staff': ['staff', 'hod'],
+    'students': ['student']
+}
+
 # Custom decorator to enforce admin access
 def admin_required(fn):
     @jwt_required()
@@ -32,14 +63,37 @@ def admin_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+def _group_by_department(entries):
+    """Group serialized rows under every department code (empty list if none)."""
+    departmentcode = request.args.get('departmentcode')
+    codes = [departmentcode] if departmentcode else [code for (code,) in db.session.query(Department.departmentcode)]
+    result = {code: [] for code in codes}
+    for entry in entries:
+        result.setdefault(entry.departmentcode, []).append(entry.to_dict())
+    return result
+
 # Fetch all users (excluding admins)
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_users():
+    """
+    Returns non-admin users, optionally filtered by role, departmentcode, semester and batch.
+    Passing ``limit`` or ``cursor`` switches to keyset pagination on admission_number;
+    follow ``next_cursor`` for the next page.
+    """
     try:
-        users = User.query.filter(User.role != 'admin').all()
+        query = apply_filters(User.query.filter(User.role != 'admin'), User, USER_FILTERS)
+        if pagination_requested():
+            users, next_cursor, total = paginate(query, User.admission_number)
+            logger.info(f"Fetched page of {len(users)} non-admin users")
+            return jsonify(page_response(users, next_cursor, total)), 200
+
+        users = query.all()
         logger.info(f"Fetched {len(users)} non-admin users")
         return jsonify([user.to_dict() for user in users]), 200
+    except ValueError as e:
+        logger.warning(f"Invalid pagination parameters: {str(e)}")
+        return jsonify({'error': 'Invalid pagination parameters', 'details': str(e)}), 400
     except Exception as e:
         logger.error(f"Failed to fetch users: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -52,35 +106,93 @@ def get_users_by_department():
     Returns a JSON object with users grouped by department code.
     Ensures every department has an entry, even if staff or students are empty.
     Used by frontend to populate instructor dropdown.
+
+    Optional query param ``include`` selects the groups to return
+    (``staff``, ``students`` or ``staff,students``; default both), so the
+    instructor dropdown can skip students entirely. The whole result comes from
+    a single ordered scan and is streamed out one department at a time.
     """
     try:
-        departments = Department.query.all()
-        if not departments:
+        include = [group.strip() for group in request.args.get('include', 'staff,students').replace('|', ',').split(',') if group.strip()]
+        invalid_groups = [group for group in include if group not in USER_GROUPS]
+        if not include or invalid_groups:
+            logger.warning(f"Invalid include parameter: {request.args.get('include')}")
+            return jsonify({'error': f'Invalid include value. Must be one or more of: {", ".join(USER_GROUPS)}'}), 400
+
+        roles = [role for group in include for role in USER_GROUPS[group]]
+        rows = iter(db.session.execute(
+            select(Department.departmentcode, User)
+            .outerjoin(User, and_(User.departmentcode == Department.departmentcode, User.role.in_(roles)))
+            .order_by(Department.departmentcode, User.admission_number)
+            .execution_options(yield_per=500)
+        ))
+        first_row = next(rows, None)
+        if first_row is None:
             logger.warning("No departments found in the database")
             return jsonify({'error': 'No departments available'}), 404
 
-        result = {}
-        for dept in departments:
-            staff = User.query.filter(
-                User.departmentcode == dept.departmentcode,
-                User.role.in_(['staff', 'hod'])
-            ).all()
-            students = User.query.filter(
-                User.departmentcode == dept.departmentcode,
-                User.role == 'student'
-            ).all()
-            result[dept.departmentcode] = {
-                'staff': [user.to_dict() for user in staff],  # Always a list, even if empty
-                'students': [user.to_dict() for user in students]  # Always a list, even if empty
-            }
-            logger.debug(f"Department {dept.departmentcode}: {len(staff)} staff, {len(students)} students")
-
-        logger.info(f"Successfully fetched users for {len(departments)} departments")
-        return jsonify(result), 200
+        def generate():
+            yield '{'
+            current_code, groups, separator = None, None, ''
+            for departmentcode, user in itertools.chain([first_row], rows):
+                if departmentcode != current_code:
+                    if current_code is not None:
+                        yield f"{separator}{json.dumps(current_code)}: {json.dumps(groups)}"
+                        separator = ', '
+                    current_code = departmentcode
+                    groups = {group: [] for group in include}  # Always a list, even if empty
+                if user is not None:
+                    groups['students' if user.role == 'student' else 'staff'].append(user.to_dict())
+            yield f"{separator}{json.dumps(current_code)}: {json.dumps(groups)}"
+            yield '}'
+            logger.info(f"Streamed users by department (include: {', '.join(include)})")
+
+        return Response(stream_with_context(generate()), mimetype='application/json'), 200
     except Exception as e:
         logger.error(f"Failed to fetch users by department: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+def _validate_new_user(data):
+    """
+    Extracts and validates the fields of a new user (everything except the
+    database uniqueness and department checks). Returns (fields, error).
+    """
+    role = data.get('role')
+    fields = {
+        'admission_number': data.get('admission_number'),
+        'username': data.get('username'),
+        'email': data.get('email'),
+        'password': data.get('password'),
+        'role': role,
+        'departmentcode': data.get('departmentcode'),
+        'batch': data.get('batch') if role == 'student' else None,
+        'semester': data.get('semester') if role == 'student' else None,
+        'phone_number': data.get('phone_number')
+    }
+
+    required_fields = ['admission_number', 'username', 'email', 'password', 'role', 'departmentcode']
+    missing_fields = [field for field in required_fields if not fields[field]]
+    if missing_fields:
+        return fields, f'Missing required fields: {", ".join(missing_fields)}'
+
+    if role not in VALID_ROLES:
+        return fields, f'Invalid role. Must be one of: {", ".join(VALID_ROLES)}'
+
+    if not re.match(r"[^@]+@[^@]+\.[^@]+", fields['email']):
+        return fields, 'Invalid email format'
+
+    phone_number = fields['phone_number']
+    if phone_number and (not phone_number.isdigit() or len(phone_number) < 10):
+        return fields, 'Phone number must be at least 10 digits'
+
+    if role == 'student':
+        if not fields['batch']:
+            return fields, 'Batch is required for students'
+        if fields['semester'] not in VALID_SEMESTERS:
+            return fields, f'Semester must be one of: {", ".join(VALID_SEMESTERS)}'
+
+    return fields, None
+
 # Add a new user
 @admin_bp.route('/add_user', methods=['POST'])
 @admin_required
@@ -95,61 +207,30 @@ def register_user():
             logger.warning("No JSON data provided in request")
             return jsonify({'error': 'No JSON data provided'}), 400
 
-        admission_number = data.get('admission_number')
-        username = data.get('username')
-        email = data.get('email')
-        password = data.get('password')
-        role = data.get('role')
-        departmentcode = data.get('departmentcode')
-        batch = data.get('batch') if role == 'student' else None
-        semester = data.get('semester') if role == 'student' else None
-        phone_number = data.get('phone_number')
-
-        required_fields = {
-            'admission_number': admission_number,
-            'username': username,
-            'email': email,
-            'password': password,
-            'role': role,
-            'departmentcode': departmentcode
-        }
-        missing_fields = [field for field, value in required_fields.items() if not value]
-        if missing_fields:
-            logger.warning(f"Missing fields: {', '.join(missing_fields)}")
-            return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
-
-        valid_roles = ['hod', 'staff', 'student']
-        if role not in valid_roles:
-            logger.warning(f"Invalid role: {role}")
-            return jsonify({'error': f'Invalid role. Must be one of: {", ".join(valid_roles)}'}), 400
-
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            logger.warning(f"Invalid email format: {email}")
-            return jsonify({'error': 'Invalid email format'}), 400
-
-        if phone_number and (not phone_number.isdigit() or len(phone_number) < 10):
-            logger.warning(f"Invalid phone number: {phone_number}")
-            return jsonify({'error': 'Phone number must be at least 10 digits'}), 400
-
-        if role == 'student':
-            if not batch:
-                logger.warning("Batch missing for student role")
-                return jsonify({'error': 'Batch is required for students'}), 400
-            valid_semesters = [f'S{i}' for i in range(1, 9)]
-            if semester not in valid_semesters:
-                logger.warning(f"Invalid semester: {semester}")
-                return jsonify({'error': f'Semester must be one of: {", ".join(valid_semesters)}'}), 400
+        fields, error = _validate_new_user(data)
+        if error:
+            logger.warning(f"Invalid user data: {error}")
+            return jsonify({'error': error}), 400
+        admission_number = fields['admission_number']
+        username = fields['username']
+        email = fields['email']
+        password = fields['password']
+        role = fields['role']
+        departmentcode = fields['departmentcode']
+        batch = fields['batch']
+        semester = fields['semester']
+        phone_number = fields['phone_number']
 
         existing_user = User.query.filter(
             (User.admission_number == admission_number) | (User.email == email)
         ).first()
         if existing_user:
-            if existing_user.admission_number == admission_number:
+            # MySQL's default collation matched these case-insensitively
+            if existing_user.admission_number.lower() == admission_number.lower():
                 logger.warning(f"Admission number {admission_number} already exists")
                 return jsonify({'error': 'Admission number already exists'}), 409
-            if existing_user.email == email:
-                logger.warning(f"Email {email} already exists")
-                return jsonify({'error': 'Email already exists'}), 409
+            logger.warning(f"Email {email} already exists")
+            return jsonify({'error': 'Email already exists'}), 409
 
         if not Department.query.filter_by(departmentcode=departmentcode).first():
             logger.warning(f"Invalid department code: {departmentcode}")
@@ -180,6 +261,160 @@ def register_user():
         logger.error(f"Failed to register user: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+# Bulk import users from a CSV or JSONL upload
+@admin_bp.route('/users/bulk', methods=['POST'])
+@admin_required
+def bulk_import_users():
+    """
+    Imports many users in one request. Accepts a CSV (with a header row) or JSONL
+    upload in the ``file`` form field, or the same content as the raw request body
+    with a text/csv or application/jsonl content type. Columns match add_user.
+
+    All rows are validated in one pass, duplicates are found with set-based
+    queries, passwords are hashed on a process pool and valid rows are inserted
+    in batched executemany chunks. Returns a per-row error report.
+    """
+    try:
+        rows, error = _read_bulk_rows()
+        if error:
+            logger.warning(f"Bulk import rejected: {error}")
+            return jsonify({'error': error}), 400
+        if len(rows) > BULK_IMPORT_MAX_ROWS:
+            logger.warning(f"Bulk import of {len(rows)} rows exceeds limit of {BULK_IMPORT_MAX_ROWS}")
+            return jsonify({'error': f'Too many rows (maximum {BULK_IMPORT_MAX_ROWS})'}), 413
+
+        errors = []
+        candidates = []
+        seen_admission_numbers = set()
+        seen_emails = set()
+        for row_number, data in rows:
+            if isinstance(data, str):
+                errors.append({'row': row_number, 'error': data})
+                continue
+            fields, row_error = _validate_new_user(data)
+            if not row_error and _unique_key(fields['admission_number']) in seen_admission_numbers:
+                row_error = 'Duplicate admission number in file'
+            if not row_error and _unique_key(fields['email']) in seen_emails:
+                row_error = 'Duplicate email in file'
+            if row_error:
+                errors.append({'row': row_number, 'admission_number': fields['admission_number'], 'error': row_error})
+                continue
+            seen_admission_numbers.add(_unique_key(fields['admission_number']))
+            seen_emails.add(_unique_key(fields['email']))
+            candidates.append((row_number, fields))
+
+        existing_admission_numbers = {_unique_key(value) for value in _existing_values(User.admission_number, seen_admission_numbers)}
+        existing_emails = {_unique_key(value) for value in _existing_values(User.email, seen_emails)}
+        department_codes = {code for (code,) in db.session.query(Department.departmentcode)}
+
+        valid = []
+        for row_number, fields in candidates:
+            if _unique_key(fields['admission_number']) in existing_admission_numbers:
+                row_error = 'Admission number already exists'
+            elif _unique_key(fields['email']) in existing_emails:
+                row_error = 'Email already exists'
+            elif fields['departmentcode'] not in department_codes:
+                row_error = 'Invalid department code'
+            else:
+                valid.append(fields)
+                continue
+            errors.append({'row': row_number, 'admission_number': fields['admission_number'], 'error': row_error})
+
+        if valid:
+            passwords = [fields['password'] for fields in valid]
+            with ProcessPoolExecutor(max_workers=BULK_IMPORT_WORKERS) as pool:
+                hashed = pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (BULK_IMPORT_WORKERS * 4)))
+                for fields, hashed_password in zip(valid, hashed):
+                    fields['password'] = hashed_password
+
+            for start in range(0, len(valid), BULK_CHUNK_SIZE):
+                db.session.execute(insert(User), valid[start:start + BULK_CHUNK_SIZE])
+            db.session.commit()
+
+        errors.sort(key=lambda entry: entry['row'])
+        logger.info(f"Bulk import finished: {len(valid)} inserted, {len(errors)} rejected out of {len(rows)} rows")
+        return jsonify({
+            'message': 'Bulk import completed',
+            'total_rows': len(rows),
+            'inserted': len(valid),
+            'failed': len(errors),
+            'errors': errors
+        }), 201 if valid else 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to bulk import users: {str(e)}")
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+def _read_bulk_rows():
+    """
+    Parses the uploaded CSV/JSONL into (row_number, data) pairs. A row that cannot
+    be parsed carries its error message as a string instead of a dict.
+    Returns (rows, error).
+    """
+    upload = request.files.get('file')
+    if upload:
+        content = upload.read()
+        name = (upload.filename or '').lower()
+        is_csv = name.endswith('.csv') or upload.mimetype == 'text/csv'
+        is_jsonl = name.endswith(('.jsonl', '.ndjson')) or upload.mimetype in JSONL_MIMETYPES
+    else:
+        content = request.get_data()
+        is_csv = request.mimetype == 'text/csv'
+        is_jsonl = request.mimetype in JSONL_MIMETYPES
+    if not is_csv and not is_jsonl:
+        return None, 'Upload a .csv or .jsonl file'
+
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return None, 'File must be UTF-8 encoded'
+
+    rows = []
+    if is_csv:
+        reader = csv.DictReader(io.StringIO(text))
+        for row_number, record in enumerate(reader, start=1):
+            rows.append((row_number, _normalize_row(record)))
+    else:
+        for row_number, line in enumerate((line for line in text.splitlines() if line.strip()), start=1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                rows.append((row_number, 'Invalid JSON'))
+                continue
+            rows.append((row_number, _normalize_row(record) if isinstance(record, dict) else 'Each line must be a JSON object'))
+
+    if not rows:
+        return None, 'No rows provided'
+    return rows, None
+
+def _normalize_row(record):
+    """Strips keys and values and turns empty cells into None."""
+    return {
+        key.strip(): (str(value).strip() or None) if value is not None else None
+        for key, value in record.items() if key
+    }
+
+def _unique_key(value):
+    """
+    Comparison key for the unique admission_number and email columns. MySQL's
+    default collation treats them case-insensitively, so 'Foo@x.com' and
+    'foo@x.com' collide on insert and must be caught as duplicates here.
+    """
+    return value.lower()
+
+def _existing_values(column, values, *criteria):
+    """Returns the subset of values already present in a column, queried in chunks."""
+    values = list(values)
+    existing = set()
+    for start in range(0, len(values), BULK_CHUNK_SIZE):
+        chunk = values[start:start + BULK_CHUNK_SIZE]
+        existing.update(value for (value,) in db.session.query(column).filter(column.in_(chunk), *criteria))
+    return existing
+
+def _hash_password(password):
+    """Hashes a single password; module-level so it can run in a worker process."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
 # Update an existing user
 @admin_bp.route('/update_user/<string:admission_number>', methods=['PUT'])
 @admin_required
@@ -259,36 +494,10 @@ def delete_user(admission_number):
             logger.warning(f"Attempt to delete admin user {admission_number}")
             return jsonify({'error': 'Cannot delete admin users'}), 403
 
-        if user.role == 'student':
-            assignments = Assignment.query.filter_by(submitted_by=admission_number).all()
-            for assignment in assignments:
-                file_path = os.path.join(ASSIGNMENTS_FOLDER, assignment.submission_filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                db.session.delete(assignment)
-
-            requests = Requests.query.filter_by(admission_number=admission_number).all()
-            for req in requests:
-                file_path = os.path.join(REQUESTS_FOLDER, req.filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                db.session.delete(req)
-
-        elif user.role in ['staff', 'hod']:
-            subjects = Subject.query.filter_by(instructor_id=admission_number).all()
-            for subject in subjects:
-                subject.instructor_id = None
-
-            assignments = Assignment.query.filter_by(instructor_id=admission_number).all()
-            for assignment in assignments:
-                file_path = os.path.join(ASSIGNMENTS_FOLDER, assignment.submission_filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                db.session.delete(assignment)
-
         user_data = user.to_dict()
-        db.session.delete(user)
+        files = _purge_users([admission_number])
         db.session.commit()
+        schedule_removal(files)
 
         logger.info(f"Deleted user {admission_number} and associated records")
         return jsonify({
@@ -300,14 +509,112 @@ def delete_user(admission_number):
         logger.error(f"Failed to delete user {admission_number}: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+# Delete many users at once (e.g. a graduated batch)
+@admin_bp.route('/users/bulk', methods=['DELETE'])
+@admin_required
+def bulk_delete_users():
+    """
+    Deletes non-admin users selected by a JSON body with either
+    ``admission_numbers`` (a list) or ``batch``. Dependent rows are removed with
+    set-based statements and uploaded files are cleaned up in the background.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        admission_numbers = data.get('admission_numbers')
+        batch = data.get('batch')
+
+        if bool(admission_numbers) == bool(batch):
+            logger.warning("Bulk delete needs exactly one of admission_numbers or batch")
+            return jsonify({'error': 'Provide either admission_numbers or batch'}), 400
+        if admission_numbers is not None and not isinstance(admission_numbers, list):
+            logger.warning("Bulk delete admission_numbers is not a list")
+            return jsonify({'error': 'admission_numbers must be a list'}), 400
+
+        requested = {str(number) for number in admission_numbers or []}
+        if batch:
+            targets = [number for (number,) in db.session.query(User.admission_number).filter(User.role != 'admin', User.batch == str(batch))]
+        else:
+            targets = list(_existing_values(User.admission_number, requested) - _existing_admins(requested))
+
+        files = _purge_users(targets)
+        db.session.commit()
+        schedule_removal(files)
+
+        skipped = sorted(requested - set(targets))
+        logger.info(f"Bulk deleted {len(targets)} users ({len(skipped)} skipped)")
+        return jsonify({
+            'message': 'Users deleted successfully',
+            'deleted': len(targets),
+            'skipped': skipped
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to bulk delete users: {str(e)}")
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+def _existing_admins(admission_numbers):
+    """Returns which of the given admission numbers belong to admin users."""
+    return _existing_values(User.admission_number, admission_numbers, User.role == 'admin')
+
+def _purge_users(admission_numbers):
+    """
+    Deletes the given users and their dependent rows with bulk DELETE/UPDATE
+    statements (no ORM loading). Unassigns them as subject instructors, drops
+    their blob references and returns the upload paths to remove once the
+    transaction has committed.
+    """
+    files = []
+    for start in range(0, len(admission_numbers), BULK_CHUNK_SIZE):
+        chunk = admission_numbers[start:start + BULK_CHUNK_SIZE]
+        assignment_filter = or_(Assignment.submitted_by.in_(chunk), Assignment.instructor_id.in_(chunk))
+
+        files.extend(
+            os.path.join(ASSIGNMENTS_FOLDER, filename)
+            for (filename,) in db.session.query(Assignment.submission_filename)
+            .filter(assignment_filter, Assignment.submission_filename.isnot(None), Assignment.content_hash.is_(None))
+        )
+        files.extend(
+            os.path.join(REQUESTS_FOLDER, filename)
+            for (filename,) in db.session.query(Requests.filename)
+            .filter(Requests.admission_number.in_(chunk), Requests.content_hash.is_(None))
+        )
+        content_hashes = [
+            content_hash for (content_hash,) in db.session.query(Assignment.content_hash)
+            .filter(assignment_filter, Assignment.content_hash.isnot(None))
+        ]
+        content_hashes.extend(
+            content_hash for (content_hash,) in db.session.query(Requests.content_hash)
+            .filter(Requests.admission_number.in_(chunk), Requests.content_hash.isnot(None))
+        )
+
+        Assignment.query.filter(assignment_filter).delete(synchronize_session=False)
+        Requests.query.filter(Requests.admission_number.in_(chunk)).delete(synchronize_session=False)
+        Subject.query.filter(Subject.instructor_id.in_(chunk)).update({Subject.instructor_id: None}, synchronize_session=False)
+        User.query.filter(User.admission_number.in_(chunk)).delete(synchronize_session=False)
+        files.extend(release(content_hashes))
+    return files
+
 # Fetch all subjects
 @admin_bp.route('/subjects', methods=['GET'])
 @admin_required
 def get_all_subjects():
+    """
+    Returns subjects, optionally filtered by departmentcode and semester.
+    Passing ``limit`` or ``cursor`` switches to keyset pagination on id.
+    """
     try:
-        subjects = Subject.query.all()
+        query = apply_filters(Subject.query, Subject, SCOPE_FILTERS)
+        if pagination_requested():
+            subjects, next_cursor, total = paginate(query, Subject.id)
+            logger.info(f"Fetched page of {len(subjects)} subjects")
+            return jsonify(page_response(subjects, next_cursor, total)), 200
+
+        subjects = query.all()
         logger.info(f"Fetched {len(subjects)} subjects")
         return jsonify([subject.to_dict() for subject in subjects]), 200
+    except ValueError as e:
+        logger.warning(f"Invalid pagination parameters: {str(e)}")
+        return jsonify({'error': 'Invalid pagination parameters', 'details': str(e)}), 400
     except Exception as e:
         logger.error(f"Failed to fetch subjects: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -463,14 +770,24 @@ def delete_subject(subject_code):
 @admin_bp.route('/timetable', methods=['GET'])
 @admin_required
 def get_timetable():
+    """
+    Returns timetable entries grouped by department, optionally filtered by
+    departmentcode and semester. Passing ``limit`` or ``cursor`` switches to a
+    flat, keyset-paginated list ordered by id.
+    """
     try:
-        departments = Department.query.all()
-        result = {}
-        for dept in departments:
-            timetable_entries = Timetable.query.filter_by(departmentcode=dept.departmentcode).all()
-            result[dept.departmentcode] = [entry.to_dict() for entry in timetable_entries]
-        logger.info(f"Fetched timetable for {len(departments)} departments")
+        query = apply_filters(Timetable.query, Timetable, SCOPE_FILTERS)
+        if pagination_requested():
+            timetables, next_cursor, total = paginate(query, Timetable.id)
+            logger.info(f"Fetched page of {len(timetables)} timetable entries")
+            return jsonify(page_response(timetables, next_cursor, total)), 200
+
+        result = _group_by_department(query.order_by(Timetable.id).all())
+        logger.info(f"Fetched timetable for {len(result)} departments")
         return jsonify(result), 200
+    except ValueError as e:
+        logger.warning(f"Invalid pagination parameters: {str(e)}")
+        return jsonify({'error': 'Invalid pagination parameters', 'details': str(e)}), 400
     except Exception as e:
         logger.error(f"Failed to fetch timetable: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -482,7 +799,9 @@ def delete_timetable(timetable_id):
     try:
         timetable = Timetable.query.get_or_404(timetable_id)
         db.session.delete(timetable)
+        files = release([timetable.content_hash])
         db.session.commit()
+        schedule_removal(files)
         logger.info(f"Timetable {timetable_id} deleted successfully")
         return jsonify({'message': 'Timetable deleted successfully'}), 200
     except Exception as e:
@@ -494,14 +813,24 @@ def delete_timetable(timetable_id):
 @admin_bp.route('/notes', methods=['GET'])
 @admin_required
 def get_notes():
+    """
+    Returns notes grouped by department, optionally filtered by departmentcode
+    and semester. Passing ``limit`` or ``cursor`` switches to a flat,
+    keyset-paginated list ordered by id.
+    """
     try:
-        departments = Department.query.all()
-        result = {}
-        for dept in departments:
-            notes = Notes.query.filter_by(departmentcode=dept.departmentcode).all()
-            result[dept.departmentcode] = [note.to_dict() for note in notes]
-        logger.info(f"Fetched notes for {len(departments)} departments")
+        query = apply_filters(Notes.query, Notes, SCOPE_FILTERS)
+        if pagination_requested():
+            notes, next_cursor, total = paginate(query, Notes.id)
+            logger.info(f"Fetched page of {len(notes)} notes")
+            return jsonify(page_response(notes, next_cursor, total)), 200
+
+        result = _group_by_department(query.order_by(Notes.id).all())
+        logger.info(f"Fetched notes for {len(result)} departments")
         return jsonify(result), 200
+    except ValueError as e:
+        logger.warning(f"Invalid pagination parameters: {str(e)}")
+        return jsonify({'error': 'Invalid pagination parameters', 'details': str(e)}), 400
     except Exception as e:
         logger.error(f"Failed to fetch notes: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -513,7 +842,10 @@ def delete_note(note_id):
     try:
         note = Notes.query.get_or_404(note_id)
         db.session.delete(note)
+        files = release([note.content_hash])
         db.session.commit()
+        schedule_removal(files)
+        notes_index.schedule_removal([note_id])
         logger.info(f"Note {note_id} deleted successfully")
         return jsonify({'message': 'Note deleted successfully'}), 200
     except Exception as e:
@@ -625,4 +957,26 @@ def delete_department(departmentcode):
     except Exception as e:
         db.session.rollback()
         logger.error(f"Failed to delete department {departmentcode}: {str(e)}")
-        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+# Process metrics
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """
+    Returns this worker's counters (cache hits/misses, evictions, errors),
+    timings (e.g. chatbot first-token latency), the PDF text cache size,
+    the chat response cache hit rate and the LLM call queue depth.
+    Metrics are per process and reset on restart.
+    """
+    try:
+        return jsonify({
+            'counters': metrics.snapshot(),
+            'timings': metrics.timings(),
+            'pdf_text_cache': pdf_text_cache.stats(),
+            'chat_cache': chat_cache.stats(),
+            'llm_limiter': llm_limiter.stats()
+        }), 200
+    except Exception as e:
+        logger.error(f"Failed to fetch metrics: {str(e)}")
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from database import db
 from models import Announcement, User
+from utils.conditional import scope_version, make_etag, is_not_modified, not_modified, with_etag
 from functools import wraps
 import logging
 import smtplib
@@ -71,8 +72,12 @@ def send_email(to_emails, subject, body):
 def get_announcements():
     """Fetch all announcements for authenticated users."""
     try:
+        etag = make_etag(scope_version(Announcement.updated_at, id_column=Announcement.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         announcements = Announcement.query.all()
-        return jsonify([announcement.to_dict() for announcement in announcements]), 200
+        return with_etag(jsonify([announcement.to_dict() for announcement in announcements]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch announcements: {str(e)}")
         return jsonify({'error': 'Failed to fetch announcements', 'details': str(e)}), 500
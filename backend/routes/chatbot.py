@@ -1,20 +1,29 @@
 import os
-import asyncio
-import aiohttp
-import certifi
-import ssl
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_cors import CORS
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-from io import BytesIO
+from PyPDF2 import __version__ as PYPDF2_VERSION
+import asyncio
+import hashlib
+import json
 import logging
 import re
-
-# Import db and models
-from database import db
-from models import User, Department, Notes, Timetable, Subject
+import time
+
+# Import models
+from models import Notes
+from utils.blob_store import stored_file
+from utils import pdf_text_cache
+from utils.pdf_extract import extract_text
+from utils import notes_index
+from utils import campus_answers, campus_context, intent_matcher
+from utils.openrouter_client import get_client, OPENROUTER_BASE_URL, DEFAULT_BASE_URL
+from utils import metrics
+from utils.response_cache import chat_cache, chat_cache_key, data_version
+from utils.single_flight import SingleFlight, wait_shared
+from utils.llm_limiter import llm_limiter, LimitExceeded
+from utils.offload import run_blocking, resolved
 
 load_dotenv()
 
@@ -27,196 +36,248 @@ logger = logging.getLogger(__name__)
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not OPENROUTER_API_KEY:
-    raise ValueError("❌ ERROR: OPENROUTER_API_KEY is missing! Please check your .env file.")
+    if OPENROUTER_BASE_URL == DEFAULT_BASE_URL:
+        raise ValueError("❌ ERROR: OPENROUTER_API_KEY is missing! Please check your .env file.")
+    # A local stand-in (OPENROUTER_BASE_URL) does not check the key
+    logger.warning(f"OPENROUTER_API_KEY is not set; using a placeholder key for {OPENROUTER_BASE_URL}")
+    OPENROUTER_API_KEY = "local"
+
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o")
 
 HEADERS = {
     "Authorization": f"Bearer {OPENROUTER_API_KEY}",
     "Content-Type": "application/json"
 }
 
+# Number of note chunks retrieved for a notes question
+NOTES_TOP_K = int(os.getenv('NOTES_TOP_K', 5))
+
 # Define the uploads/notes folder path
 NOTES_FOLDER = os.path.join(os.path.dirname(__file__), '../uploads/notes')
 os.makedirs(NOTES_FOLDER, exist_ok=True)
 
-def extract_pdf_text(file_data, max_chars=5000):
-    """Extract text from a PDF file."""
+# Bump when the extraction logic changes so cached text is re-extracted
+PDF_EXTRACTOR_VERSION = f"pypdf2-{PYPDF2_VERSION}-2"
+
+# Concurrent identical requests share one PDF extraction / one OpenRouter call
+extraction_flight = SingleFlight('pdf_extract_flight')
+chat_flight = SingleFlight('chat_flight')
+
+def _extraction_key(max_chars, page_range, strategy):
+    """Cache version for one extraction setup; budgeted text differs per budget and page selection."""
+    pages = f"{page_range[0]}-{page_range[1]}" if page_range else "all"
+    return f"{PDF_EXTRACTOR_VERSION}:{max_chars}:{pages}:{strategy}"
+
+def _clip_text(text, max_chars):
+    return text[:max_chars] if text.strip() else "No readable text found in the PDF."
+
+def extract_pdf_text(file_data, max_chars=5000, content_hash=None, page_range=None, strategy='sequential'):
+    """Extract text from a PDF file, reusing cached text for identical content."""
+    content_hash = content_hash or hashlib.sha256(file_data).hexdigest()
+    key = _extraction_key(max_chars, page_range, strategy)
+    text = pdf_text_cache.get(content_hash, key)
+    if text is None:
+        text = extraction_flight.run(
+            (content_hash, key),
+            lambda: _extract_and_cache(file_data, content_hash, key, max_chars, page_range, strategy)
+        )
+    return _clip_text(text, max_chars)
+
+def _extract_and_cache(file_data, content_hash, key, max_chars, page_range, strategy):
     try:
-        pdf = PdfReader(BytesIO(file_data))
-        text = " ".join(page.extract_text() for page in pdf.pages if page.extract_text())
-        if not text.strip():
-            return "No readable text found in the PDF."
-        return text[:max_chars]
+        extraction = extract_text(file_data, max_chars, page_range, strategy)
     except Exception as e:
         logger.error(f"PDF extraction error: {str(e)}")
         return f"Error extracting PDF text: {str(e)}"
-
-def find_matching_note_file(query):
-    """Search for a matching note file in the uploads/notes folder based on the query."""
+    logger.info(
+        f"Extracted {len(extraction.text)} chars from {extraction.pages_parsed}/{extraction.page_count} pages "
+        f"in {extraction.elapsed:.3f}s ({'complete' if extraction.complete else 'budget reached'})"
+    )
+    pdf_text_cache.put(content_hash, key, extraction.text)
+    return extraction.text
+
+def read_note_text(file_path, content_hash, max_chars=5000, page_range=None, strategy='sequential'):
+    """Text of a stored note; the file is only read when the cache misses."""
+    if content_hash:
+        text = pdf_text_cache.get(content_hash, _extraction_key(max_chars, page_range, strategy))
+        if text is not None:
+            return _clip_text(text, max_chars)
+    with open(file_path, 'rb') as f:
+        return extract_pdf_text(f.read(), max_chars, content_hash, page_range, strategy)
+
+def find_matching_note_file(query, department_code=None, message_match=None):
+    """Resolve a notes question to an uploaded note through the indexed notes catalog."""
     try:
-        query_lower = query.lower()
-        semester_match = re.search(r's(\d+)', query_lower)  # Extract semester (e.g., S8)
-        subject_match = re.search(r'(embedded system|computer science|mechanics|electronics|[\w\s]+)', query_lower)  # Extract subject/topic
-        module_match = re.search(r'module\s*(\d+)', query_lower)  # Extract module number
-
-        semester = semester_match.group(1) if semester_match else None
-        subject = subject_match.group(1).replace(" ", "_") if subject_match else None
-        module = module_match.group(1) if module_match else None
-
-        # Construct possible filename patterns
-        patterns = []
-        if semester and subject and module:
-            patterns.append(f"S{semester}_{subject}_Module{module}".lower())
-        if semester and subject:
-            patterns.append(f"S{semester}_{subject}".lower())
-        if semester and module:
-            patterns.append(f"S{semester}_.*_Module{module}".lower())
-        if semester:
-            patterns.append(f"S{semester}_.*".lower())
-
-        for filename in os.listdir(NOTES_FOLDER):
-            filename_lower = filename.lower()
-            if filename_lower.endswith('.pdf'):
-                for pattern in patterns:
-                    if re.search(pattern, filename_lower):
-                        file_path = os.path.join(NOTES_FOLDER, filename)
-                        with open(file_path, 'rb') as f:
-                            file_data = f.read()
-                        logger.info(f"Matched note file: {filename}")
-                        return filename, file_data
+        message_match = message_match or intent_matcher.match(query)
+        module_match = re.search(r'module\s*(\d+)', query.lower())  # Extract module number
+        if not message_match.semesters:
+            logger.info(f"No semester in notes query: {query}")
+            return None, None, None
+
+        notes = Notes.query.filter_by(semester=message_match.semesters[0])
+        if department_code:
+            notes = notes.filter_by(departmentcode=department_code)
+        module = int(module_match.group(1)) if module_match else None
+
+        # Most specific match first: subject and module, subject, module, any note of the semester.
+        # Mentioned catalog subjects are tried longest first.
+        candidates = []
+        if module:
+            candidates.extend((subject, module) for subject in message_match.note_subjects)
+        candidates.extend((subject, None) for subject in message_match.note_subjects)
+        if module:
+            candidates.append((None, module))
+        candidates.append((None, None))
+
+        for subject_name, module_number in candidates:
+            lookup = notes
+            if subject_name:
+                lookup = lookup.filter_by(subject_name=subject_name)
+            if module_number:
+                lookup = lookup.filter_by(module_number=module_number)
+            match = lookup.with_entities(Notes.filename, Notes.content_hash).order_by(Notes.uploaded_at.desc()).first()
+            if match:
+                filename, content_hash = match
+                folder, name = stored_file(NOTES_FOLDER, filename, content_hash)
+                file_path = os.path.join(folder, name)
+                if not os.path.exists(file_path):
+                    logger.warning(f"Matched note file {filename} is missing on disk")
+                    return None, None, None
+                logger.info(f"Matched note file: {filename}")
+                return filename, file_path, content_hash
         logger.info(f"No matching note file found for query: {query}")
-        return None, None
+        return None, None, None
     except Exception as e:
-        logger.error(f"Error searching notes folder: {str(e)}")
-        return None, None
-
-def fetch_database_context(user_message):
-    """Fetch relevant campus data based on the user's query."""
+        logger.error(f"Error searching notes catalog: {str(e)}")
+        return None, None, None
+
+def retrieve_notes(user_message, message_match, department_code, claimed_semester):
+    """
+    Notes text for a notes question: the most relevant chunks of the caller's
+    department/semester notes, falling back to the catalog lookup of a single
+    note. Returns (notes text, matched filename).
+    """
+    semester = next(iter(message_match.semesters), None) or claimed_semester
+    chunks = notes_index.search(user_message, department_code, semester, NOTES_TOP_K) if department_code else []
+    if chunks:
+        logger.info(f"Retrieved {len(chunks)} note chunks from {len({chunk['note_id'] for chunk in chunks})} notes")
+        return "\n\n".join(f"[{chunk['filename']}] {chunk['text']}" for chunk in chunks), chunks[0]['filename']
+    matched_note_filename, note_file_path, note_content_hash = find_matching_note_file(user_message, department_code, message_match)
+    if not note_file_path:
+        return None, matched_note_filename
+    return read_note_text(note_file_path, note_content_hash), matched_note_filename
+
+def fetch_database_context(message_match):
+    """Relevant campus data for the user's query, from the cached department snapshots."""
     try:
-        if not db.session:
-            logger.error("Database session not initialized")
-            return "Database not available."
-
-        message_lower = user_message.lower()
-        campus_keywords = ["hod", "staff", "department", "student", "subject", "notes", "timetable", "campus", "college"]
-        
-        if not any(keyword in message_lower for keyword in campus_keywords):
-            return None  # No campus context needed
-
-        context_lines = ["Campus Database Context:"]
-
-        # Extract department code if mentioned
-        dept_code = None
-        for code in ["cs", "sc", "ee", "me"]:
-            if code in message_lower:
-                dept_code = code.upper()
-                break
-
-        if "hod" in message_lower:
-            hods = User.query.filter_by(role='hod')
-            if dept_code:
-                hods = hods.filter_by(departmentcode=dept_code)
-            hods = hods.limit(1).all()
-            if hods:
-                hod_info = "\n".join(
-                    [f"HOD of {h.departmentcode}: {h.username} (ID: {h.admission_number}, Email: {h.email})" for h in hods]
-                )
-                context_lines.append("Heads of Departments:")
-                context_lines.append(hod_info)
-            else:
-                context_lines.append(f"No HOD found for {dept_code or 'any department'}.")
-
-        if "staff" in message_lower:
-            staff = User.query.filter(User.role.in_(['staff', 'hod']))
-            if dept_code:
-                staff = staff.filter_by(departmentcode=dept_code)
-            staff = staff.limit(3).all()
-            staff_info = "\n".join(
-                [f"Staff: {s.username} (ID: {s.admission_number}, Role: {s.role}, Dept: {s.departmentcode}, Email: {s.email})" for s in staff]
-            )
-            context_lines.append("Staff (Sample):")
-            context_lines.append(staff_info)
-
-        if "department" in message_lower and "hod" not in message_lower:
-            departments = Department.query
-            if dept_code:
-                departments = departments.filter_by(departmentcode=dept_code)
-            departments = departments.limit(3).all()
-            dept_info = "\n".join([f"Department: {d.departmentcode}, Name: {d.departmentname}" for d in departments])
-            context_lines.append("Departments:")
-            context_lines.append(dept_info)
-
-        if "student" in message_lower:
-            students = User.query.filter_by(role='student')
-            if dept_code:
-                students = students.filter_by(departmentcode=dept_code)
-            students = students.limit(3).all()
-            student_info = "\n".join(
-                [f"Student: {s.username} (ID: {s.admission_number}, Dept: {s.departmentcode}, Semester: {s.semester or 'N/A'}, Batch: {s.batch or 'N/A'})" for s in students]
-            )
-            context_lines.append("Students (Sample):")
-            context_lines.append(student_info)
-
-        if "subject" in message_lower:
-            subjects = Subject.query
-            if dept_code:
-                subjects = subjects.filter_by(departmentcode=dept_code)
-            subjects = subjects.limit(3).all()
-            subject_info = "\n".join(
-                [f"Subject: {s.subject_code}, Name: {s.subject_name}, Dept: {s.departmentcode}, Semester: {s.semester}, Credits: {s.credits}" for s in subjects]
-            )
-            context_lines.append("Subjects (Sample):")
-            context_lines.append(subject_info)
-
-        if "notes" in message_lower:
-            notes = Notes.query
-            if dept_code:
-                notes = notes.filter_by(departmentcode=dept_code)
-            notes = notes.limit(3).all()
-            notes_info = "\n".join([f"Note: {n.filename}, Semester: {n.semester}, Uploaded: {n.uploaded_at}" for n in notes])
-            context_lines.append("Notes (Sample):")
-            context_lines.append(notes_info)
-
-        if "timetable" in message_lower:
-            timetables = Timetable.query
-            if dept_code:
-                timetables = timetables.filter_by(departmentcode=dept_code)
-            timetables = timetables.limit(3).all()
-            timetable_info = "\n".join([f"Timetable: {t.filename}, Semester: {t.semester}, Uploaded: {t.uploaded_at}" for t in timetables])
-            context_lines.append("Timetables (Sample):")
-            context_lines.append(timetable_info)
-
-        context = "\n".join(context_lines)
-        logger.info(f"Database context generated (size: {len(context)} chars): {context}")
+        context = campus_context.build_context(message_match)
+        if context:
+            logger.info(f"Database context generated (size: {len(context)} chars)")
         return context
     except Exception as e:
         logger.error(f"Database fetch error: {str(e)}")
         return f"Error fetching database context: {str(e)}"
 
-async def async_post_to_openrouter(payload):
-    """Asynchronously post to OpenRouter API with a timeout."""
-    timeout = aiohttp.ClientTimeout(total=15)
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    connector = aiohttp.TCPConnector(ssl=ssl_context)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        try:
-            start_time = asyncio.get_event_loop().time()
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=HEADERS,
-                json=payload,
-                timeout=timeout
-            ) as response:
-                response.raise_for_status()
-                data = await response.json()
-                end_time = asyncio.get_event_loop().time()
-                logger.info(f"OpenRouter API responded in {end_time - start_time:.2f} seconds")
-                return data
-        except asyncio.TimeoutError:
-            logger.error("OpenRouter API request timed out after 15 seconds")
-            raise Exception("Sorry, the request took too long. Try again!")
-        except aiohttp.ClientError as e:
-            logger.error(f"OpenRouter API error: {str(e)}")
-            raise Exception(f"API request failed: {str(e)}")
+async def async_post_to_openrouter(payload, user=None):
+    """Post to OpenRouter through the worker's pooled, keep-alive client, within the LLM concurrency limit."""
+    async with llm_limiter.slot(user):
+        return await get_client().post_chat(payload, HEADERS)
+
+def wants_stream(data=None):
+    """Streaming is opt-in: ``stream`` in the JSON body or form, or an Accept of text/event-stream."""
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        return True
+    if data is not None:
+        return data.get('stream') is True
+    return request.form.get('stream', '').lower() in ('1', 'true', 'yes')
+
+def build_response_dict(ai_response, pdf_text, file_name, notes_pdf_text, matched_note_filename):
+    """Shape the completed AI response for the client (PDF summary/description split, notes source)."""
+    if pdf_text:
+        lines = ai_response.split("\n")
+        summary = next((l.replace("1.", "").strip() for l in lines if l.strip().startswith("1.") or "summar" in l.lower()), "")
+        description = next((l.replace("2.", "").strip() for l in lines if l.strip().startswith("2.") or "descrip" in l.lower()), "")
+        if not summary or not description:
+            summary = ai_response[:100] if len(ai_response) > 100 else ai_response
+            description = "Key topics inferred."
+        return {
+            "summary": summary,
+            "description": description,
+            "file_name": file_name or "Uploaded PDF"
+        }
+    if notes_pdf_text:
+        return {
+            "response": ai_response,
+            "file_name": matched_note_filename
+        }
+    return {"response": ai_response}
+
+async def complete_chat(payload, cache_key, user=None):
+    """
+    Fetch a (non-streamed) completion and cache it. Returns the cache entry,
+    or None when the AI returned nothing.
+    """
+    start_time = time.perf_counter()
+    response_data = await async_post_to_openrouter(payload, user)
+    metrics.observe('chat.upstream_seconds', time.perf_counter() - start_time)
+
+    ai_response = response_data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+    logger.info(f"AI response: {ai_response}")
+    if not ai_response:
+        return None
+
+    entry = {'response': ai_response, 'tokens': (response_data.get("usage") or {}).get("total_tokens") or 0}
+    chat_cache.set(cache_key, entry)
+    return entry
+
+def cached_chat_events(ai_response, pdf_text, file_name, notes_pdf_text, matched_note_filename):
+    """Send a complete (cached or local) response in the streaming format: a single delta, then ``done``."""
+    yield sse_event({"delta": ai_response})
+    yield sse_event(build_response_dict(ai_response, pdf_text, file_name, notes_pdf_text, matched_note_filename), event="done")
+
+def cache_bypassed():
+    """Clients skip the response cache with ``Cache-Control: no-cache`` or ``X-Chat-Cache: bypass``."""
+    return (
+        'no-cache' in request.headers.get('Cache-Control', '').lower()
+        or request.headers.get('X-Chat-Cache', '').lower() == 'bypass'
+    )
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_chat_events(payload, pdf_text, file_name, notes_pdf_text, matched_note_filename, cache_key=None):
+    """
+    Relay OpenRouter's token stream as Server-Sent Events: one ``data`` event per
+    delta, then a ``done`` event carrying the post-processed response (or an
+    ``error`` event). A completed response is stored under ``cache_key``.
+    """
+    start_time = time.perf_counter()
+    first_token_at = None
+    buffer = []
+    try:
+        for delta in get_client().stream_chat(payload, HEADERS):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics.observe('chat.first_token_seconds', first_token_at - start_time)
+            buffer.append(delta)
+            yield sse_event({"delta": delta})
+    except Exception as e:
+        logger.error(f"Streaming error: {str(e)}")
+        metrics.increment('chat.stream_errors')
+        yield sse_event({"error": f"Sorry, something went wrong: {str(e)}"}, event="error")
+        return
+
+    metrics.observe('chat.stream_seconds', time.perf_counter() - start_time)
+    ai_response = "".join(buffer).strip()
+    logger.info(f"AI response (streamed): {ai_response}")
+    if not ai_response:
+        logger.warning("Empty response from OpenRouter")
+        yield sse_event({"error": "Oops, no response from the AI. Try again?"}, event="error")
+        return
+    if cache_key:
+        chat_cache.set(cache_key, {'response': ai_response, 'tokens': 0})
+    yield sse_event(build_response_dict(ai_response, pdf_text, file_name, notes_pdf_text, matched_note_filename), event="done")
 
 @chatbot_bp.route('/chat', methods=['POST'])
 @jwt_required()
@@ -225,14 +286,14 @@ async def chatbot():
     logger.info(f"Received request: Content-Type={request.content_type}, Headers={request.headers}")
     
     user_message = None
-    pdf_text = None
+    stream = False
+    pdf_data = None
     file_name = None
-    notes_pdf_text = None
-    matched_note_filename = None
 
     try:
         if request.content_type.startswith('multipart/form-data'):
             user_message = request.form.get("message")
+            stream = wants_stream()
             file = request.files.get("file")
             if file:
                 file_name = file.filename
@@ -242,31 +303,59 @@ async def chatbot():
                     logger.warning(f"File {file_name} exceeds 10MB: {file_size} bytes")
                     return jsonify({"error": "File size exceeds 10MB limit"}), 400
                 if file_name.lower().endswith('.pdf'):
-                    pdf_text = extract_pdf_text(file.read())
+                    pdf_data = file.read()
                 else:
                     return jsonify({"error": "Only PDF files are supported."}), 400
             logger.info(f"Multipart data - Message: {user_message}, File: {file_name}, Size: {file_size if file else 'N/A'} bytes")
         else:
             data = request.get_json(silent=True)
             user_message = data.get("message") if data else None
+            stream = wants_stream(data or {})
             logger.info(f"JSON data - Message: {user_message}")
 
-        if not user_message and not pdf_text:
+        if not user_message and not pdf_data:
             logger.warning("No message or PDF provided")
             return jsonify({"error": "Please say something or upload a PDF!"}), 400
 
         current_user = get_jwt_identity()
         logger.info(f"Authenticated user: {current_user}")
 
-        # Check for notes-related query and fetch matching file from uploads/notes
-        if user_message and "notes" in user_message.lower():
-            matched_note_filename, note_file_data = find_matching_note_file(user_message)
-            if note_file_data:
-                notes_pdf_text = extract_pdf_text(note_file_data)
-
-        db_context = fetch_database_context(user_message) if user_message else None
-
+        # Database and file work runs on worker threads so this view's event loop stays free
+        message_match = await run_blocking(intent_matcher.match, user_message) if user_message else None
+
+        # Factual campus questions with an exact answer skip the LLM entirely
+        if message_match and not pdf_data:
+            start_time = time.perf_counter()
+            local_answer = await run_blocking(campus_answers.answer, user_message, message_match)
+            if local_answer:
+                metrics.increment('chat.local_answers')
+                metrics.observe('chat.local_answer_seconds', time.perf_counter() - start_time)
+                logger.info(f"Answered locally from the campus tables (intents: {sorted(message_match.intents)})")
+                if stream:
+                    response = Response(
+                        cached_chat_events(local_answer, None, None, None, None),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+                    )
+                else:
+                    response = jsonify({"response": local_answer})
+                response.headers['X-Chat-Answer'] = 'local'
+                return response, 200
+
+        # PDF extraction, notes retrieval and the database context overlap instead of adding up
+        claims = get_jwt()
+        start_time = time.perf_counter()
+        pdf_text, (notes_pdf_text, matched_note_filename), db_context = await asyncio.gather(
+            run_blocking(extract_pdf_text, pdf_data) if pdf_data else resolved(),
+            run_blocking(retrieve_notes, user_message, message_match, claims.get('departmentcode'), claims.get('semester'))
+            if message_match and 'notes' in message_match.intents else resolved((None, None)),
+            run_blocking(fetch_database_context, message_match) if message_match else resolved()
+        )
+        metrics.observe('chat.context_seconds', time.perf_counter() - start_time)
+
+        # The part of the data the prompt is built from versions the cached response
         if pdf_text:
+            prompt_context = pdf_text
             prompt = (
                 f"Analyze this PDF content:\n\n{pdf_text}\n\n"
                 "1. Summarize it in up to 50 words.\n"
@@ -275,22 +364,25 @@ async def chatbot():
             if user_message:
                 prompt = f"{user_message}\n\n{prompt}"
         elif notes_pdf_text:
+            prompt_context = notes_pdf_text
             prompt = (
                 f"Based on the following notes content from {matched_note_filename}:\n\n{notes_pdf_text}\n\n"
                 f"Explain the content in response to: {user_message}\n\n"
                 "Keep the explanation concise and educational."
             )
         elif db_context:
+            prompt_context = db_context
             prompt = (
                 f"Answer based on this campus database:\n\n{db_context}\n\n"
                 f"Question: {user_message}\n\n"
                 "Keep it concise. Say 'Not enough info' if unclear."
             )
         else:
+            prompt_context = None
             prompt = user_message
 
         payload = {
-            "model": "openai/gpt-4o",
+            "model": OPENROUTER_MODEL,
             "messages": [
                 {
                     "role": "system",
@@ -306,38 +398,66 @@ async def chatbot():
             "temperature": 0.7
         }
 
-        logger.info(f"Sending payload to OpenRouter (size: {len(str(payload))} chars)")
-        response_data = await async_post_to_openrouter(payload)
+        cache_key = chat_cache_key(user_message, payload, data_version(prompt_context))
+        if cache_bypassed():
+            cache_status = 'bypass'
+            metrics.increment('chat_cache.bypasses')
+            cached = None
+        else:
+            cached = chat_cache.get(cache_key)
+            cache_status = 'hit' if cached else 'miss'
+            pending = None if cached or not stream else chat_flight.in_flight(cache_key)
+            if pending is not None:
+                # A streaming request replays an identical call already in flight
+                metrics.increment('chat_flight.coalesced')
+                cached = await wait_shared(pending)
+                cache_status = 'coalesced'
+                if not cached:
+                    return jsonify({"error": "Oops, no response from the AI. Try again?"}), 500
+
+        if cached:
+            logger.info(f"Chat cache {cache_status} for key {cache_key[:12]}")
+            metrics.increment('chat_cache.tokens_saved', cached['tokens'])
+            if stream:
+                response = Response(
+                    cached_chat_events(cached['response'], pdf_text, file_name, notes_pdf_text, matched_note_filename),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+                )
+            else:
+                response = jsonify(build_response_dict(cached['response'], pdf_text, file_name, notes_pdf_text, matched_note_filename))
+            response.headers['X-Chat-Cache'] = cache_status
+            return response, 200
+
+        logger.info(f"Sending payload to OpenRouter (size: {len(str(payload))} chars, stream: {stream})")
+        if stream:
+            # The slot is held until the server closes the stream, even if it is never read
+            await llm_limiter.acquire(current_user)
+            response = Response(
+                stream_chat_events(payload, pdf_text, file_name, notes_pdf_text, matched_note_filename, cache_key),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+            response.call_on_close(lambda: llm_limiter.release(current_user))
+            response.headers['X-Chat-Cache'] = cache_status
+            return response
 
-        ai_response = response_data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        logger.info(f"AI response: {ai_response}")
+        if cache_status == 'bypass':
+            entry = await complete_chat(payload, cache_key, current_user)
+        else:
+            entry = await chat_flight.run_async(cache_key, lambda: complete_chat(payload, cache_key, current_user))
 
-        if not ai_response:
+        if not entry:
             logger.warning("Empty response from OpenRouter")
             return jsonify({"error": "Oops, no response from the AI. Try again?"}), 500
 
-        if pdf_text:
-            lines = ai_response.split("\n")
-            summary = next((l.replace("1.", "").strip() for l in lines if l.strip().startswith("1.") or "summar" in l.lower()), "")
-            description = next((l.replace("2.", "").strip() for l in lines if l.strip().startswith("2.") or "descrip" in l.lower()), "")
-            if not summary or not description:
-                summary = ai_response[:100] if len(ai_response) > 100 else ai_response
-                description = "Key topics inferred."
-            response_dict = {
-                "summary": summary,
-                "description": description,
-                "file_name": file_name or "Uploaded PDF"
-            }
-        elif notes_pdf_text:
-            response_dict = {
-                "response": ai_response,
-                "file_name": matched_note_filename
-            }
-        else:
-            response_dict = {"response": ai_response}
-
-        return jsonify(response_dict), 200
+        response = jsonify(build_response_dict(entry['response'], pdf_text, file_name, notes_pdf_text, matched_note_filename))
+        response.headers['X-Chat-Cache'] = cache_status
+        return response, 200
 
+    except LimitExceeded as e:
+        logger.warning(f"Chat request refused ({e.status}): {str(e)}")
+        return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         logger.error(f"Server error: {str(e)}", exc_info=True)
         return jsonify({"error": f"Sorry, something went wrong: {str(e)}"}), 500
\ No newline at end of file
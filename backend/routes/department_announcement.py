@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from database import db
 from models import DepartmentAnnouncement, User, Department
+from utils.conditional import scope_version, make_etag, is_not_modified, not_modified, with_etag
 from functools import wraps
 import logging
 import smtplib
@@ -69,11 +70,14 @@ def get_department_announcements():
 
         # Admins can see all dept announcements; others see only their dept
         claims = get_jwt()
-        if claims.get('role') == 'admin':
-            announcements = DepartmentAnnouncement.query.all()
-        else:
-            announcements = DepartmentAnnouncement.query.filter_by(departmentcode=user.departmentcode).all()
-        return jsonify([announcement.to_dict() for announcement in announcements]), 200
+        scope = None if claims.get('role') == 'admin' else user.departmentcode
+        criteria = [] if scope is None else [DepartmentAnnouncement.departmentcode == scope]
+        etag = make_etag(scope or '*', scope_version(DepartmentAnnouncement.updated_at, *criteria, id_column=DepartmentAnnouncement.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        announcements = DepartmentAnnouncement.query.filter(*criteria).all()
+        return with_etag(jsonify([announcement.to_dict() for announcement in announcements]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch department announcements: {str(e)}", exc_info=True)
         return jsonify({'error': 'Failed to fetch department announcements', 'details': str(e)}), 500
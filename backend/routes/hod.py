@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify, request, send_from_directory
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt
 from database import db
 from models import User, Subject, Timetable, Notes, Requests
+from utils.file_delivery import send_upload
+from utils.file_cleanup import schedule_removal
+from utils.blob_store import store_upload, stored_file, release_upload
+from utils import notes_index
+from utils.conditional import scope_version, make_etag, is_not_modified, not_modified, with_etag
 from functools import wraps
 from datetime import datetime
 import os
@@ -79,8 +84,12 @@ def get_hod_subjects():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
-        subjects = Subject.query.filter_by(departmentcode=department_code).all()
-        return jsonify([s.to_dict() for s in subjects]), 200
+        etag = make_etag(department_code, scope_version(Subject.updated_at, Subject.departmentcode == department_code, id_column=Subject.id), scope_version(User.updated_at, User.departmentcode == department_code, User.role.in_(['staff', 'hod'])))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        subjects = Subject.with_instructor().filter_by(departmentcode=department_code).all()
+        return with_etag(jsonify([s.to_dict(include_instructor=True) for s in subjects]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch subjects: {str(e)}")
         return jsonify({'error': 'Failed to fetch subjects', 'details': str(e)}), 500
@@ -152,8 +161,12 @@ def get_hod_department_users():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(User.updated_at, User.departmentcode == department_code, User.role == 'student'))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         users = User.query.filter_by(departmentcode=department_code, role='student').all()
-        return jsonify([user.to_dict() for user in users]), 200
+        return with_etag(jsonify([user.to_dict() for user in users]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch department students: {str(e)}")
         return jsonify({'error': 'Failed to fetch department students', 'details': str(e)}), 500
@@ -208,8 +221,12 @@ def get_hod_timetable():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(Timetable.uploaded_at, Timetable.departmentcode == department_code, id_column=Timetable.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         timetables = Timetable.query.filter_by(departmentcode=department_code).all()
-        return jsonify([t.to_dict() for t in timetables]), 200
+        return with_etag(jsonify([t.to_dict() for t in timetables]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch timetable: {str(e)}")
         return jsonify({'error': 'Failed to fetch timetable', 'details': str(e)}), 500
@@ -230,10 +247,9 @@ def upload_timetable():
             return jsonify({'error': 'Invalid semester or file type'}), 400
 
         filename = f"{semester}_timetable_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        file_path = os.path.join(TIMETABLE_FOLDER, filename)
-        file.save(file_path)
+        content_hash = store_upload(file)
 
-        new_timetable = Timetable(semester=semester, filename=filename, departmentcode=department_code)
+        new_timetable = Timetable(semester=semester, filename=filename, departmentcode=department_code, content_hash=content_hash)
         db.session.add(new_timetable)
         db.session.commit()
 
@@ -253,12 +269,10 @@ def delete_hod_timetable(timetable_id):
         if not timetable:
             return jsonify({'error': 'Timetable not found'}), 404
 
-        file_path = os.path.join(TIMETABLE_FOLDER, timetable.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
         db.session.delete(timetable)
+        files = release_upload(TIMETABLE_FOLDER, timetable.filename, timetable.content_hash)
         db.session.commit()
+        schedule_removal(files)
         return jsonify({'message': 'Timetable deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -272,8 +286,12 @@ def get_hod_notes():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(Notes.uploaded_at, Notes.departmentcode == department_code, id_column=Notes.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         notes = Notes.query.filter_by(departmentcode=department_code).all()
-        return jsonify([n.to_dict() for n in notes]), 200
+        return with_etag(jsonify([n.to_dict() for n in notes]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch notes: {str(e)}")
         return jsonify({'error': 'Failed to fetch notes', 'details': str(e)}), 500
@@ -300,12 +318,20 @@ def upload_notes():
             return jsonify({'error': 'Subject not found'}), 404
 
         filename = f"{semester}_{subject_name}_Module{module_number}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-        file_path = os.path.join(NOTES_FOLDER, filename)
-        file.save(file_path)
+        content_hash = store_upload(file)
 
-        new_note = Notes(semester=semester, filename=filename, departmentcode=department_code)
+        new_note = Notes(
+            semester=semester,
+            filename=filename,
+            departmentcode=department_code,
+            content_hash=content_hash,
+            subject_name=subject_name,
+            module_number=int(module_number)
+        )
         db.session.add(new_note)
         db.session.commit()
+        folder, name = stored_file(NOTES_FOLDER, filename, content_hash)
+        notes_index.schedule_indexing(new_note.id, os.path.join(folder, name), department_code, semester, filename, content_hash)
 
         return jsonify({'message': 'Notes uploaded successfully', 'note': new_note.to_dict()}), 201
     except Exception as e:
@@ -323,12 +349,11 @@ def delete_hod_note(note_id):
         if not note:
             return jsonify({'error': 'Note not found or not authorized'}), 404
 
-        file_path = os.path.join(NOTES_FOLDER, note.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
         db.session.delete(note)
+        files = release_upload(NOTES_FOLDER, note.filename, note.content_hash)
         db.session.commit()
+        schedule_removal(files)
+        notes_index.schedule_removal([note_id])
         return jsonify({'message': 'Note deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -342,11 +367,15 @@ def list_staff():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(User.updated_at, User.departmentcode == department_code, User.role.in_(['staff', 'hod'])))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         staff = User.query.filter(
             User.departmentcode == department_code,
             User.role.in_(['staff', 'hod'])
         ).all()
-        return jsonify([s.to_dict() for s in staff]), 200
+        return with_etag(jsonify([s.to_dict() for s in staff]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch staff: {str(e)}")
         return jsonify({'error': 'Failed to fetch staff', 'details': str(e)}), 500
@@ -462,13 +491,13 @@ def download_request(filename):
             logger.warning(f"Request file {filename} not found or not authorized for HOD in department {department_code}")
             return jsonify({'error': 'File not found or not authorized'}), 404
 
-        file_path = os.path.join(REQUESTS_FOLDER, filename)
-        if not os.path.exists(file_path):
+        folder, name = stored_file(REQUESTS_FOLDER, filename, request_entry.content_hash)
+        if not os.path.exists(os.path.join(folder, name)):
             logger.warning(f"Request file {filename} not found on server")
             return jsonify({'error': 'File not found on server'}), 404
 
         logger.info(f"Serving file {filename} for download")
-        return send_from_directory(REQUESTS_FOLDER, filename, as_attachment=True)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download request file {filename}: {str(e)}")
         return jsonify({'error': 'Failed to download file', 'details': str(e)}), 500
\ No newline at end of file
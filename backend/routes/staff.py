@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt
 from database import db
 from models import User, Subject, Timetable, Notes, Assignment  # Ensure Assignment is imported
+from utils.file_delivery import send_upload
+from utils.file_cleanup import schedule_removal
+from utils.blob_store import store_upload, stored_file, release_upload
+from utils import notes_index
+from utils.conditional import scope_version, make_etag, is_not_modified, not_modified, with_etag
 from functools import wraps
 from datetime import datetime
 import os
@@ -78,8 +83,12 @@ def get_staff_department_users():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(User.updated_at, User.departmentcode == department_code, User.role == 'student'))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         users = User.query.filter_by(departmentcode=department_code, role='student').all()
-        return jsonify([user.to_dict() for user in users]), 200
+        return with_etag(jsonify([user.to_dict() for user in users]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch department students: {str(e)}")
         return jsonify({'error': 'Failed to fetch department students', 'details': str(e)}), 500
@@ -91,8 +100,12 @@ def get_staff_subjects():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
-        subjects = Subject.query.filter_by(departmentcode=department_code).all()
-        return jsonify([subject.to_dict() for subject in subjects]), 200
+        etag = make_etag(department_code, scope_version(Subject.updated_at, Subject.departmentcode == department_code, id_column=Subject.id), scope_version(User.updated_at, User.departmentcode == department_code, User.role.in_(['staff', 'hod'])))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        subjects = Subject.with_instructor().filter_by(departmentcode=department_code).all()
+        return with_etag(jsonify([subject.to_dict(include_instructor=True) for subject in subjects]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch subjects: {str(e)}")
         return jsonify({'error': 'Failed to fetch subjects', 'details': str(e)}), 500
@@ -104,8 +117,12 @@ def get_staff_timetable():
     try:
         current_user = get_jwt()
         departmentcode = current_user.get('departmentcode')  # Consistent naming
+        etag = make_etag(departmentcode, scope_version(Timetable.uploaded_at, Timetable.departmentcode == departmentcode, id_column=Timetable.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         timetables = Timetable.query.filter_by(departmentcode=departmentcode).all()
-        return jsonify([timetable.to_dict() for timetable in timetables]), 200
+        return with_etag(jsonify([timetable.to_dict() for timetable in timetables]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch timetables: {str(e)}")
         return jsonify({'error': 'Failed to fetch timetables', 'details': str(e)}), 500
@@ -133,12 +150,20 @@ def upload_staff_notes():
             return jsonify({'error': 'Subject not found'}), 404
 
         filename = f"{semester}_{subject_name}_Module{module_number}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-        file_path = os.path.join(NOTES_FOLDER, filename)
-        file.save(file_path)
-
-        new_notes = Notes(semester=semester, filename=filename, departmentcode=department_code)
+        content_hash = store_upload(file)
+
+        new_notes = Notes(
+            semester=semester,
+            filename=filename,
+            departmentcode=department_code,
+            content_hash=content_hash,
+            subject_name=subject_name,
+            module_number=int(module_number)
+        )
         db.session.add(new_notes)
         db.session.commit()
+        folder, name = stored_file(NOTES_FOLDER, filename, content_hash)
+        notes_index.schedule_indexing(new_notes.id, os.path.join(folder, name), department_code, semester, filename, content_hash)
 
         return jsonify({'message': 'Notes uploaded successfully', 'notes': new_notes.to_dict()}), 201
     except Exception as e:
@@ -152,8 +177,12 @@ def get_staff_notes():
     try:
         current_user = get_jwt()
         department_code = current_user.get('departmentcode')
+        etag = make_etag(department_code, scope_version(Notes.uploaded_at, Notes.departmentcode == department_code, id_column=Notes.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         notes = Notes.query.filter_by(departmentcode=department_code).all()
-        return jsonify([note.to_dict() for note in notes]), 200
+        return with_etag(jsonify([note.to_dict() for note in notes]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch notes: {str(e)}")
         return jsonify({'error': 'Failed to fetch notes', 'details': str(e)}), 500
@@ -168,12 +197,11 @@ def delete_staff_note(note_id):
         if not note:
             return jsonify({'error': 'Note not found or not authorized'}), 404
 
-        file_path = os.path.join(NOTES_FOLDER, note.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
         db.session.delete(note)
+        files = release_upload(NOTES_FOLDER, note.filename, note.content_hash)
         db.session.commit()
+        schedule_removal(files)
+        notes_index.schedule_removal([note_id])
         return jsonify({'message': 'Note deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -189,9 +217,13 @@ def get_staff_assignments():
         current_user = get_jwt()
         instructor_id = current_user.get('sub')  # Use admission_number from JWT
         logger.info(f"Fetching assignments for instructor_id: {instructor_id}")
+        etag = make_etag(instructor_id, scope_version(Assignment.submitted_at, Assignment.instructor_id == instructor_id, id_column=Assignment.id))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         assignments = Assignment.query.filter_by(instructor_id=instructor_id).all()
         logger.info(f"Found {len(assignments)} assignments")
-        return jsonify({'assignments': [assignment.to_dict() for assignment in assignments]}), 200
+        return with_etag(jsonify({'assignments': [assignment.to_dict() for assignment in assignments]}), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch assignments: {str(e)}")
         return jsonify({'error': 'Failed to fetch assignments', 'details': str(e)}), 500
@@ -206,11 +238,11 @@ def download_assignment(filename):
         if not assignment:
             return jsonify({'error': 'Assignment not found or not authorized'}), 404
 
-        file_path = os.path.join(ASSIGNMENTS_FOLDER, filename)
-        if not os.path.exists(file_path):
+        folder, name = stored_file(ASSIGNMENTS_FOLDER, filename, assignment.content_hash)
+        if not os.path.exists(os.path.join(folder, name)):
             return jsonify({'error': 'File not found on server'}), 404
 
-        return send_file(file_path, as_attachment=True, download_name=filename)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download assignment: {str(e)}")
         return jsonify({'error': 'Failed to download assignment', 'details': str(e)}), 500
\ No newline at end of file
@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify, send_from_directory, request
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt
 from database import db
-from models import User, Notes, Timetable, Subject, Assignment, Requests
+from models import User, Notes, Timetable, Subject, Assignment, Requests, Announcement, DepartmentAnnouncement
 from utils.token import role_required
+from utils.file_delivery import send_upload
+from utils.file_cleanup import schedule_removal
+from utils.blob_store import store_upload, stored_file, release_upload
+from utils.conditional import scope_version, make_etag, is_not_modified, not_modified, with_etag
 import os
 import logging
 from werkzeug.utils import secure_filename
@@ -25,6 +29,19 @@ os.makedirs(TIMETABLE_FOLDER, exist_ok=True)
 os.makedirs(ASSIGNMENTS_FOLDER, exist_ok=True)
 os.makedirs(REQUESTS_FOLDER, exist_ok=True)
 
+# Cheap validators for conditional GET: one aggregate query per scope, no rows loaded
+def _notes_version(department_code, semester):
+    return scope_version(Notes.uploaded_at, Notes.departmentcode == department_code, Notes.semester == semester, id_column=Notes.id)
+
+def _timetable_version(department_code, semester):
+    return scope_version(Timetable.uploaded_at, Timetable.departmentcode == department_code, Timetable.semester == semester, id_column=Timetable.id)
+
+def _subjects_version(department_code, semester):
+    return scope_version(Subject.updated_at, Subject.departmentcode == department_code, Subject.semester == semester, id_column=Subject.id)
+
+def _teachers_version(department_code):
+    return scope_version(User.updated_at, User.departmentcode == department_code, User.role.in_(['staff', 'hod']))
+
 @students_bp.route('/notes', methods=['GET'])
 @jwt_required()
 @role_required('student')
@@ -41,9 +58,13 @@ def get_student_notes():
             logger.warning(f"Student {admission_number} missing departmentcode or semester in JWT: {current_user}")
             return jsonify({'error': 'Department code or semester not set in token'}), 400
 
+        etag = make_etag(department_code, semester, _notes_version(department_code, semester))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         notes = Notes.query.filter_by(departmentcode=department_code, semester=semester).all()
         logger.info(f"Fetched {len(notes)} notes for student {admission_number}")
-        return jsonify([note.to_dict() for note in notes]), 200
+        return with_etag(jsonify([note.to_dict() for note in notes]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch notes for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to fetch notes', 'details': str(e)}), 500
@@ -64,9 +85,13 @@ def get_student_timetable():
             logger.warning(f"Student {admission_number} missing departmentcode or semester in JWT: {current_user}")
             return jsonify({'error': 'Department code or semester not set in token'}), 400
 
+        etag = make_etag(department_code, semester, _timetable_version(department_code, semester))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         timetables = Timetable.query.filter_by(departmentcode=department_code, semester=semester).all()
         logger.info(f"Fetched {len(timetables)} timetables for student {admission_number}")
-        return jsonify([timetable.to_dict() for timetable in timetables]), 200
+        return with_etag(jsonify([timetable.to_dict() for timetable in timetables]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch timetables for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to fetch timetables', 'details': str(e)}), 500
@@ -87,24 +112,18 @@ def get_student_subjects():
             logger.warning(f"Student {admission_number} missing departmentcode or semester in JWT: {current_user}")
             return jsonify({'error': 'Department code or semester not set in token'}), 400
 
-        subjects = Subject.query.filter_by(departmentcode=department_code, semester=semester).all()
+        etag = make_etag(department_code, semester, _subjects_version(department_code, semester), _teachers_version(department_code))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        subjects = Subject.with_instructor().filter_by(departmentcode=department_code, semester=semester).all()
         logger.info(f"Fetched {len(subjects)} subjects for student {admission_number}")
 
         if not subjects:
             logger.info(f"No subjects found for departmentcode={department_code}, semester={semester}")
-            return jsonify({'message': 'No subjects available for your department/semester', 'subjects': []}), 200
-
-        subject_list = []
-        for subject in subjects:
-            subject_dict = subject.to_dict()
-            if subject.instructor_id:
-                instructor = User.query.get(subject.instructor_id)
-                subject_dict['instructor_name'] = instructor.username if instructor else 'Not Assigned'
-            else:
-                subject_dict['instructor_name'] = 'Not Assigned'
-            subject_list.append(subject_dict)
-
-        return jsonify(subject_list), 200
+            return with_etag(jsonify({'message': 'No subjects available for your department/semester', 'subjects': []}), etag), 200
+
+        return with_etag(jsonify([subject.to_dict(include_instructor=True) for subject in subjects]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch subjects for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to fetch subjects', 'details': str(e)}), 500
@@ -124,6 +143,10 @@ def get_student_teachers():
             logger.warning(f"Student {admission_number} missing departmentcode in JWT: {current_user}")
             return jsonify({'error': 'Department code not set in token'}), 400
 
+        etag = make_etag(department_code, _teachers_version(department_code))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
         teachers = User.query.filter(
             User.departmentcode == department_code,
             User.role.in_(['staff', 'hod'])
@@ -132,13 +155,107 @@ def get_student_teachers():
 
         if not teachers:
             logger.info(f"No teachers found for departmentcode={department_code}")
-            return jsonify({'message': 'No teachers available for your department', 'teachers': []}), 200
+            return with_etag(jsonify({'message': 'No teachers available for your department', 'teachers': []}), etag), 200
 
-        return jsonify([teacher.to_dict() for teacher in teachers]), 200
+        return with_etag(jsonify([teacher.to_dict() for teacher in teachers]), etag), 200
     except Exception as e:
         logger.error(f"Failed to fetch teachers for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to fetch teachers', 'details': str(e)}), 500
 
+# Dashboard sections: each builds its list for the student in a single query
+def _dashboard_notes(admission_number, department_code, semester):
+    return [note.to_dict() for note in Notes.query.filter_by(departmentcode=department_code, semester=semester)]
+
+def _dashboard_timetable(admission_number, department_code, semester):
+    return [timetable.to_dict() for timetable in Timetable.query.filter_by(departmentcode=department_code, semester=semester)]
+
+def _dashboard_subjects(admission_number, department_code, semester):
+    return [subject.to_dict(include_instructor=True)
+            for subject in Subject.with_instructor().filter_by(departmentcode=department_code, semester=semester)]
+
+def _dashboard_teachers(admission_number, department_code, semester):
+    return [teacher.to_dict() for teacher in User.query.filter(
+        User.departmentcode == department_code,
+        User.role.in_(['staff', 'hod'])
+    )]
+
+def _dashboard_assignments(admission_number, department_code, semester):
+    return [assignment.to_dict() for assignment in Assignment.query.filter_by(departmentcode=department_code, submitted_by=admission_number)]
+
+def _dashboard_requests(admission_number, department_code, semester):
+    return [req.to_dict() for req in Requests.query.filter_by(admission_number=admission_number)]
+
+def _dashboard_announcements(admission_number, department_code, semester):
+    return [announcement.to_dict() for announcement in Announcement.query]
+
+def _dashboard_department_announcements(admission_number, department_code, semester):
+    return [announcement.to_dict() for announcement in DepartmentAnnouncement.query.filter_by(departmentcode=department_code)]
+
+DASHBOARD_VERSIONS = {
+    'notes': lambda admission_number, department_code, semester: _notes_version(department_code, semester),
+    'timetable': lambda admission_number, department_code, semester: _timetable_version(department_code, semester),
+    'subjects': lambda admission_number, department_code, semester: _subjects_version(department_code, semester) + '/' + _teachers_version(department_code),
+    'teachers': lambda admission_number, department_code, semester: _teachers_version(department_code),
+    'assignments': lambda admission_number, department_code, semester: scope_version(
+        Assignment.submitted_at, Assignment.departmentcode == department_code, Assignment.submitted_by == admission_number, id_column=Assignment.id),
+    'requests': lambda admission_number, department_code, semester: scope_version(
+        Requests.updated_at, Requests.admission_number == admission_number, id_column=Requests.application_id),
+    'announcements': lambda admission_number, department_code, semester: scope_version(Announcement.updated_at, id_column=Announcement.id),
+    'department_announcements': lambda admission_number, department_code, semester: scope_version(
+        DepartmentAnnouncement.updated_at, DepartmentAnnouncement.departmentcode == department_code, id_column=DepartmentAnnouncement.id)
+}
+
+DASHBOARD_SECTIONS = {
+    'notes': _dashboard_notes,
+    'timetable': _dashboard_timetable,
+    'subjects': _dashboard_subjects,
+    'teachers': _dashboard_teachers,
+    'assignments': _dashboard_assignments,
+    'requests': _dashboard_requests,
+    'announcements': _dashboard_announcements,
+    'department_announcements': _dashboard_department_announcements
+}
+
+@students_bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+@role_required('student')
+def get_student_dashboard():
+    """
+    Returns everything the student home screen needs in one response: notes,
+    timetable, subjects, teachers, assignments, requests, announcements and
+    department announcements, one query per section. ``sections`` (comma
+    separated) limits the response to the listed sections. The ETag combines a
+    cheap per-section validator, so an unchanged dashboard answers 304 without
+    loading any rows.
+    """
+    try:
+        current_user = get_jwt()
+        admission_number = current_user.get('sub')
+        department_code = current_user.get('departmentcode')
+        semester = current_user.get('semester')
+
+        if not department_code or not semester:
+            logger.warning(f"Student {admission_number} missing departmentcode or semester in JWT: {current_user}")
+            return jsonify({'error': 'Department code or semester not set in token'}), 400
+
+        requested = request.args.get('sections')
+        sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(DASHBOARD_SECTIONS)
+        unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+        if not sections or unknown:
+            logger.warning(f"Invalid dashboard sections {requested} for student {admission_number}")
+            return jsonify({'error': f'Invalid sections. Must be one or more of: {", ".join(DASHBOARD_SECTIONS)}'}), 400
+
+        etag = make_etag(admission_number, department_code, semester, *(DASHBOARD_VERSIONS[name](admission_number, department_code, semester) for name in sections))
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        dashboard = {name: DASHBOARD_SECTIONS[name](admission_number, department_code, semester) for name in sections}
+        logger.info(f"Fetched dashboard sections {', '.join(sections)} for student {admission_number}")
+        return with_etag(jsonify(dashboard), etag), 200
+    except Exception as e:
+        logger.error(f"Failed to fetch dashboard for student {admission_number}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch dashboard', 'details': str(e)}), 500
+
 @students_bp.route('/download/notes/<filename>', methods=['GET'])
 @jwt_required()
 @role_required('student')
@@ -165,13 +282,14 @@ def download_note(filename):
             logger.warning(f"Note {filename} not found or not authorized for student {admission_number}")
             return jsonify({'error': 'Note not found or not authorized'}), 404
 
-        file_path = os.path.join(NOTES_FOLDER, filename)
+        folder, name = stored_file(NOTES_FOLDER, filename, note.content_hash)
+        file_path = os.path.join(folder, name)
         if not os.path.exists(file_path):
             logger.error(f"Note file {file_path} not found on server")
             return jsonify({'error': 'File not found on server'}), 404
 
         logger.info(f"Student {admission_number} downloaded note {filename}")
-        return send_from_directory(NOTES_FOLDER, filename, as_attachment=True)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download note {filename} for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to download note', 'details': str(e)}), 500
@@ -202,13 +320,14 @@ def download_timetable(filename):
             logger.warning(f"Timetable {filename} not found or not authorized for student {admission_number}")
             return jsonify({'error': 'Timetable not found or not authorized'}), 404
 
-        file_path = os.path.join(TIMETABLE_FOLDER, filename)
+        folder, name = stored_file(TIMETABLE_FOLDER, filename, timetable.content_hash)
+        file_path = os.path.join(folder, name)
         if not os.path.exists(file_path):
             logger.error(f"Timetable file {file_path} not found on server")
             return jsonify({'error': 'File not found on server'}), 404
 
         logger.info(f"Student {admission_number} downloaded timetable {filename}")
-        return send_from_directory(TIMETABLE_FOLDER, filename, as_attachment=True)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download timetable {filename} for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to download timetable', 'details': str(e)}), 500
@@ -332,11 +451,11 @@ def create_and_submit_assignment():
         # Save file
         student = User.query.get(admission_number)
         filename = f"{subject_code}_{student.username}_assignment_{assignment_number}.pdf"
-        file_path = os.path.join(ASSIGNMENTS_FOLDER, filename)
-        file.save(file_path)
+        content_hash = store_upload(file)
 
         # Update assignment
         assignment.submission_filename = filename
+        assignment.content_hash = content_hash
         assignment.submitted_by = admission_number
         assignment.submitted_at = datetime.utcnow()
         db.session.commit()
@@ -372,13 +491,14 @@ def download_assignment(filename):
             logger.warning(f"Assignment {filename} not found or not authorized for student {admission_number}")
             return jsonify({'error': 'Assignment not found or not authorized'}), 404
 
-        file_path = os.path.join(ASSIGNMENTS_FOLDER, filename)
+        folder, name = stored_file(ASSIGNMENTS_FOLDER, filename, assignment.content_hash)
+        file_path = os.path.join(folder, name)
         if not os.path.exists(file_path):
             logger.error(f"Assignment file {file_path} not found on server")
             return jsonify({'error': 'File not found on server'}), 404
 
         logger.info(f"Student {admission_number} downloaded assignment {filename}")
-        return send_from_directory(ASSIGNMENTS_FOLDER, filename, as_attachment=True)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download assignment {filename} for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to download assignment', 'details': str(e)}), 500
@@ -410,13 +530,13 @@ def upload_request():
 
         # Generate unique filename
         filename = f"{category}_{admission_number}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-        file_path = os.path.join(REQUESTS_FOLDER, filename)
-        file.save(file_path)
+        content_hash = store_upload(file)
 
         # Save request to database
         new_request = Requests(
             category=category,
             filename=filename,
+            content_hash=content_hash,
             admission_number=admission_number,
             status='pending',  # Default status
             created_at=datetime.utcnow()
@@ -472,13 +592,14 @@ def download_request(filename):
             logger.warning(f"Request {filename} not found or not authorized for student {admission_number}")
             return jsonify({'error': 'Request not found or not authorized'}), 404
 
-        file_path = os.path.join(REQUESTS_FOLDER, filename)
+        folder, name = stored_file(REQUESTS_FOLDER, filename, request_entry.content_hash)
+        file_path = os.path.join(folder, name)
         if not os.path.exists(file_path):
             logger.error(f"Request file {file_path} not found on server")
             return jsonify({'error': 'File not found on server'}), 404
 
         logger.info(f"Student {admission_number} downloaded request {filename}")
-        return send_from_directory(REQUESTS_FOLDER, filename, as_attachment=True)
+        return send_upload(folder, name, download_name=filename)
     except Exception as e:
         logger.error(f"Failed to download request {filename} for student {admission_number}: {str(e)}")
         return jsonify({'error': 'Failed to download request', 'details': str(e)}), 500
@@ -537,15 +658,11 @@ def delete_request(request_id):
             logger.warning(f"Request {request_id} not found or not authorized for student {admission_number}")
             return jsonify({'error': 'Request not found or not authorized'}), 404
 
-        # Delete the file from storage
-        file_path = os.path.join(REQUESTS_FOLDER, request_entry.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Deleted request file {file_path} for student {admission_number}")
-
-        # Delete the request from the database
+        # Delete the request, then its file once the delete has committed
         db.session.delete(request_entry)
+        files = release_upload(REQUESTS_FOLDER, request_entry.filename, request_entry.content_hash)
         db.session.commit()
+        schedule_removal(files)
 
         logger.info(f"Student {admission_number} deleted request {request_id}")
         return jsonify({'message': 'Request deleted successfully'}), 200
@@ -0,0 +1,58 @@
+# tests/conftest.py
+"""
+Shared fixtures. Tests run against a throwaway SQLite database rather than
+MySQL, with a bare Flask app carrying only the SQLAlchemy extension, so the
+backend's blueprints and their environment (OpenRouter keys, upload folders)
+are not needed. Install the test tools with ``pip install -r requirements-dev.txt``
+and run ``python -m pytest`` from backend/.
+"""
+import os
+import sys
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+import models  # noqa: F401 (registers the tables on db.metadata)
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def session(app):
+    return db.session
+
+@pytest.fixture
+def make_pdf():
+    """Builds a minimal PDF with one line of Helvetica text per page."""
+    def build(pages):
+        objects = ['<< /Type /Catalog /Pages 2 0 R >>']
+        kids = ' '.join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+        objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+        font_id = 3 + 2 * len(pages)
+        for i, text in enumerate(pages):
+            stream = f"BT /F1 10 Tf 10 100 Td ({text}) Tj ET"
+            objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 1200 200] /Contents {4 + 2 * i} 0 R "
+                           f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>")
+            objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+        out = '%PDF-1.4\n'
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n{body}\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + ''.join(f"{offset:010d} 00000 n \n" for offset in offsets)
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF"
+        return out.encode('latin1')
+    return build
@@ -0,0 +1,202 @@
+# tests/test_asgi.py
+import asyncio
+import contextvars
+import importlib
+import json
+import pytest
+from flask import Response
+from flask_jwt_extended import create_access_token
+
+@pytest.fixture(scope='module')
+def asgi(tmp_path_factory):
+    """asgi.py imported against a temporary SQLite database and a placeholder OpenRouter key."""
+    import config
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('OPENROUTER_API_KEY', 'test')
+        patch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path_factory.mktemp('asgi') / 'app.db'}")
+        yield importlib.import_module('asgi')
+
+@pytest.fixture(scope='module')
+def token(asgi):
+    with asgi.flask_app.app_context():
+        return create_access_token(identity='S1', additional_claims={'role': 'student', 'departmentcode': 'CS', 'semester': 'S1'})
+
+def call(app, method, path, body=b'', headers=(), chunks=1):
+    """Run one HTTP request through an ASGI app; the body arrives in ``chunks`` messages."""
+    size = max(1, -(-len(body) // chunks))
+    parts = [body[i:i + size] for i in range(0, len(body), size)] or [b'']
+    incoming = [{'type': 'http.request', 'body': part, 'more_body': i < len(parts) - 1} for i, part in enumerate(parts)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'root_path': '', 'query_string': b'', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    }
+    asyncio.run(app(scope, receive, send))
+    status = sent[0]['status']
+    response_headers = {name.decode('latin1'): value.decode('latin1') for name, value in sent[0]['headers']}
+    return status, response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+def chat_headers(token, *extra):
+    return [('Authorization', f"Bearer {token}"), ('Content-Type', 'application/json'), *extra]
+
+def test_chunked_body_without_content_length_reaches_the_view(asgi, token):
+    body = json.dumps({'message': 'How many departments are there?'}).encode('utf-8')
+    status, headers, content = call(asgi.app, 'POST', '/api/chatbot/chat', body,
+                                    chat_headers(token, ('Transfer-Encoding', 'chunked')), chunks=3)
+    assert status == 200, content
+    assert headers.get('x-chat-answer') == 'local'
+    assert 'departments' in json.loads(content)['response']
+
+def test_build_environ_uses_the_received_length(asgi):
+    scope = {'method': 'POST', 'path': '/x', 'query_string': b'', 'http_version': '1.1',
+             'headers': [(b'content-length', b'999')]}
+    environ = asgi.build_environ(scope, b'abc')
+    assert environ['CONTENT_LENGTH'] == '3'
+    assert environ['wsgi.input_terminated'] is True
+    assert environ['wsgi.input'].read() == b'abc'
+
+def test_missing_token_is_rejected_by_the_error_handlers(asgi):
+    status, _, content = call(asgi.app, 'POST', '/api/chatbot/chat', b'{}', [('Content-Type', 'application/json')])
+    assert status == 401
+    assert 'Missing Authorization Header' in content.decode('utf-8')
+
+def test_error_without_a_handler_becomes_a_500_response(asgi, token, monkeypatch):
+    # Without the app's catch-all handler, handle_user_exception re-raises
+    monkeypatch.delitem(asgi.flask_app.error_handler_spec[None][None], Exception)
+    monkeypatch.setattr(asgi.flask_app, 'preprocess_request', lambda: (_ for _ in ()).throw(ValueError('boom')))
+    status, headers, _ = call(asgi.app, 'POST', '/api/chatbot/chat', b'{}', chat_headers(token, ('Origin', 'http://localhost:5001')))
+    assert status == 500
+    assert headers.get('access-control-allow-origin') == 'http://localhost:5001'  # after_request (CORS) still ran
+
+def test_other_routes_go_through_wsgi(asgi):
+    status, _, content = call(asgi.app, 'GET', '/')
+    assert status == 200 and b'Backend is running' in content
+
+def test_streamed_wsgi_responses_share_one_loop(asgi, monkeypatch):
+    # Like note downloads under load: many streamed WSGI responses in flight on the same loop
+    monkeypatch.setitem(asgi.flask_app.view_functions, 'home', lambda: Response(iter([b'part1', b'part2'])))
+    results = []
+
+    async def one():
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': '/',
+                 'root_path': '', 'query_string': b'', 'headers': []}
+        await asgi.app(scope, receive, send)
+        results.append((sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])))
+
+    async def many():
+        await asyncio.gather(*(one() for _ in range(20)))
+
+    asyncio.run(many())
+    asyncio.run(many())
+    assert results == [(200, b'part1part2')] * 40
+
+@pytest.mark.parametrize('fail_on', [0, 1])
+def test_response_is_closed_when_sending_fails(asgi, fail_on):
+    closed = []
+    response = Response('body')
+    response.call_on_close(lambda: closed.append(True))
+    sent = []
+
+    async def send(message):
+        if len(sent) == fail_on:
+            raise OSError('client went away')
+        sent.append(message)
+
+    with pytest.raises(OSError):
+        asyncio.run(asgi.send_response(response, send, contextvars.copy_context()))
+    assert closed == [True]
+
+def test_streamed_response_is_closed_when_the_client_goes_away(asgi):
+    closed = []
+
+    def body():
+        for i in range(1000):
+            yield f"chunk {i}\n"
+
+    response = Response(body(), mimetype='text/plain')
+    response.call_on_close(lambda: closed.append(True))
+
+    async def send(message):
+        if message.get('more_body'):
+            raise OSError('client went away')
+
+    async def main():
+        with pytest.raises(OSError):
+            await asgi.send_response(response, send, contextvars.copy_context())
+        for _ in range(100):
+            if closed:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert closed == [True]
+
+def test_stream_with_context_route_runs_in_its_request_context(asgi, monkeypatch, caplog):
+    from models import db, Department
+    with asgi.flask_app.app_context():
+        db.session.merge(Department(departmentcode='CS', departmentname='Computer Science'))
+        db.session.commit()
+        admin = create_access_token(identity='admin', additional_claims={'role': 'admin'})
+    headers = {'Authorization': f"Bearer {admin}"}
+    teardowns = []
+    do_teardown_request = asgi.flask_app.do_teardown_request
+    monkeypatch.setattr(asgi.flask_app, 'do_teardown_request', lambda *args: teardowns.append(args) or do_teardown_request(*args))
+
+    with asgi.flask_app.test_client() as client:
+        expected = client.get('/api/admin/users_by_department', headers=headers).get_data()
+    expected_teardowns, teardowns[:] = len(teardowns), []
+
+    async def main():
+        result = await asyncio.to_thread(call, asgi.app, 'GET', '/api/admin/users_by_department', b'', list(headers.items()))
+        # The last teardown runs when the drain thread closes the generator, just after the last chunk is sent
+        for _ in range(100):
+            if len(teardowns) >= expected_teardowns:
+                break
+            await asyncio.sleep(0.01)
+        return result
+
+    status, _, content = asyncio.run(main())
+    assert status == 200
+    assert content == expected and json.loads(content)['CS'] == {'staff': [], 'students': []}
+    assert len(teardowns) == expected_teardowns
+    assert 'Streamed response failed' not in caplog.text
+
+def test_streamed_body_is_produced_at_the_client_pace(asgi):
+    produced, sent = [], []
+
+    def body():
+        for i in range(2000):
+            produced.append(i)
+            yield b'x' * 8192
+
+    response = Response(body())
+
+    async def send(message):
+        await asyncio.sleep(0.002)
+        sent.append(message)
+        if len(sent) > 30:
+            raise OSError('client went away')
+
+    async def main():
+        with pytest.raises(OSError):
+            await asgi.send_response(response, send, contextvars.copy_context())
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert len(produced) <= len(sent) + asgi.STREAM_BUFFER_CHUNKS + 2
@@ -0,0 +1,107 @@
+# tests/test_blob_store.py
+import io
+import os
+import threading
+import pytest
+from werkzeug.datastructures import FileStorage
+from database import db
+from models import Blob
+from utils import blob_store, file_cleanup
+
+@pytest.fixture(autouse=True)
+def blobs_folder(tmp_path, monkeypatch):
+    folder = tmp_path / 'blobs'
+    folder.mkdir()
+    monkeypatch.setattr(blob_store, 'BLOBS_FOLDER', str(folder))
+    return folder
+
+def upload(data):
+    return blob_store.store_upload(FileStorage(stream=io.BytesIO(data), filename='note.pdf'))
+
+def refcount(content_hash):
+    db.session.expire_all()
+    return db.session.get(Blob, content_hash).refcount
+
+def test_identical_uploads_share_one_file(app):
+    first = upload(b'same bytes')
+    second = upload(b'same bytes')
+    db.session.commit()
+    assert first == second
+    assert refcount(first) == 2
+    assert os.listdir(os.path.dirname(blob_store.blob_path(first))) == [first]
+
+def test_last_release_keeps_the_row_and_returns_the_path(app):
+    content_hash = upload(b'notes')
+    upload(b'notes')
+    db.session.commit()
+    assert blob_store.release([content_hash]) == []
+    assert blob_store.release([content_hash, None]) == [blob_store.blob_path(content_hash)]
+    db.session.commit()
+    assert refcount(content_hash) == 0
+
+def test_reupload_before_cleanup_keeps_the_file(app):
+    content_hash = upload(b'notes')
+    db.session.commit()
+    paths = blob_store.release([content_hash])
+    db.session.commit()
+
+    assert upload(b'notes') == content_hash
+    db.session.commit()
+    # The queued cleanup runs only now and must see the new reference
+    assert blob_store.remove_if_unreferenced(paths[0]) is False
+    assert os.path.exists(paths[0])
+    assert refcount(content_hash) == 1
+
+def test_reupload_after_cleanup_places_the_file_again(app):
+    content_hash = upload(b'notes')
+    db.session.commit()
+    paths = blob_store.release([content_hash])
+    db.session.commit()
+    assert blob_store.remove_if_unreferenced(paths[0]) is True
+
+    upload(b'notes')
+    db.session.commit()
+    assert os.path.exists(paths[0])
+    assert refcount(content_hash) == 1
+
+def test_rolled_back_upload_removes_its_new_file(app):
+    content_hash = upload(b'never committed')
+    path = blob_store.blob_path(content_hash)
+    assert os.path.exists(path)
+    db.session.rollback()
+    file_cleanup._pending.join()
+    assert not os.path.exists(path)
+    assert db.session.get(Blob, content_hash) is None
+
+def test_rolled_back_duplicate_keeps_the_committed_file(app):
+    content_hash = upload(b'shared')
+    db.session.commit()
+    upload(b'shared')
+    db.session.rollback()
+    file_cleanup._pending.join()
+    assert os.path.exists(blob_store.blob_path(content_hash))
+    assert refcount(content_hash) == 1
+
+def test_concurrent_identical_first_uploads(app):
+    barrier = threading.Barrier(2)
+    results, errors = [], []
+
+    def worker():
+        with app.app_context():
+            try:
+                barrier.wait()
+                results.append(upload(b'uploaded twice at once'))
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(results)) == 1
+    assert refcount(results[0]) == 2
+    assert os.path.exists(blob_store.blob_path(results[0]))
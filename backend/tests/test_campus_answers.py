@@ -0,0 +1,74 @@
+# tests/test_campus_answers.py
+import pytest
+from models import User, Department, Subject
+from utils import campus_answers, intent_matcher
+
+@pytest.fixture
+def campus(session):
+    for code, name in [('CS', 'Computer Science'), ('EE', 'Electrical Engineering'),
+                       ('ME', 'Mechanical Engineering'), ('SC', 'Science')]:
+        session.add(Department(departmentcode=code, departmentname=name))
+    users = [
+        ('H1', 'hod', 'CS', None, 'Asha'), ('H2', 'hod', 'ME', None, 'Ravi'),
+        ('T1', 'staff', 'CS', None, 'Binu'), ('T2', 'staff', 'EE', None, 'Devi'),
+        ('S1', 'student', 'CS', 'S6', 'Anu'), ('S2', 'student', 'CS', 'S6', 'Manu'),
+        ('S3', 'student', 'CS', 'S4', 'Vinu'), ('S4', 'student', 'ME', 'S6', 'Sinu'),
+    ]
+    for number, role, department, semester, name in users:
+        session.add(User(admission_number=number, email=f"{number.lower()}@example.com", password='x',
+                         username=name, role=role, departmentcode=department, semester=semester))
+    session.add(Subject(semester='S6', subject_code='CS601', subject_name='Compiler Design', credits=4, departmentcode='CS'))
+    session.add(Subject(semester='S4', subject_code='CS401', subject_name='Operating Systems', credits=3, departmentcode='CS'))
+    session.commit()
+
+def ask(question):
+    return campus_answers.answer(question, intent_matcher.match(question))
+
+@pytest.mark.parametrize('question, expected', [
+    ('Who is the HOD of CS?', 'The HOD of Computer Science (CS) is Asha'),
+    ('who is the hod of me', 'The HOD of Mechanical Engineering (ME) is Ravi'),
+    ('Who is the CS HOD', 'is Asha'),
+    ('who is the head of the computer science department?', 'is Asha'),
+    ('Please list the HODs', 'Ravi'),
+    ('How many students are there in S6 CS?', 'There are 2 students in S6 CS.'),
+    ('how many students in CS', 'There are 3 students in CS.'),
+    ('Number of students', 'There are 4 students in total (CS: 3, ME: 1).'),
+    ('How many teachers are there in EE', 'There is 1 staff member in EE.'),
+    ('Who are the staff in CS?', 'Staff in CS:'),
+    ('List the subjects for S6 CS', 'CS601 Compiler Design'),
+    ('how many subjects in CS and EE', 'There are 2 subjects in CS EE in total (CS: 2).'),
+    ('What are the departments in the college?', 'Computer Science (CS), Electrical Engineering (EE)'),
+    ('How many departments are there?', 'There are 4 departments.'),
+])
+def test_templated_questions_are_answered(campus, question, expected):
+    assert expected in ask(question)
+
+@pytest.mark.parametrize('question', [
+    'What does HOD stand for?',
+    'what are the responsibilities of a hod',
+    'Which department is best for AI?',
+    'How many students fail the exams on average?',
+    'Who is the HOD? Please tell me',
+    'Can you count me in for the student fest?',
+    'who is the best hod',
+    'how many teachers in S6',
+    'who are the staff',
+    'list the subjects',
+    'how many students are in compiler design',
+    'how many departments in CS',
+    'tell me a joke',
+])
+def test_other_questions_go_to_the_llm(campus, question):
+    assert ask(question) is None
+
+@pytest.mark.parametrize('message, departments', [
+    ('Who is the HOD? Please tell me', []),
+    ('Can you count me in for the student fest?', []),
+    ('hod of me', ['ME']),
+    ('students in cs and EE', ['CS', 'EE']),
+    ('ME students', ['ME']),
+    ('mechanical engineering notes', ['ME']),
+    ('Me and my friends', []),
+])
+def test_department_codes_need_uppercase_or_a_preposition(campus, message, departments):
+    assert intent_matcher.match(message).departments == departments
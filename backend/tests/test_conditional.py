@@ -0,0 +1,35 @@
+# tests/test_conditional.py
+from utils.conditional import make_etag
+
+def test_make_etag_accepts_missing_and_non_string_versions(app):
+    with app.test_request_context('/?semester=S1'):
+        etag = make_etag(None, '3:2024-01-01:6', 7)
+        assert etag == make_etag('', '3:2024-01-01:6', '7')
+        assert etag != make_etag('CS', '3:2024-01-01:6', 7)
+
+def test_make_etag_depends_on_query_string(app):
+    with app.test_request_context('/?semester=S1'):
+        first = make_etag('CS')
+    with app.test_request_context('/?semester=S2'):
+        assert make_etag('CS') != first
+
+def test_scope_version_sees_edits_to_other_rows_in_the_same_second(app, session):
+    from datetime import datetime
+    from models import Subject
+    from utils.conditional import scope_version
+    now = datetime(2024, 5, 1, 10, 0, 0)
+    session.add_all([Subject(subject_code=f"CS10{i}", subject_name=f"Subject {i}", departmentcode='CS', semester='S1', credits=3,
+                             updated_at=datetime(2024, 4, 1 + i)) for i in range(3)])
+    session.commit()
+    subjects = Subject.query.order_by(Subject.id).all()
+
+    def version():
+        return scope_version(Subject.updated_at, Subject.departmentcode == 'CS', id_column=Subject.id)
+
+    subjects[0].updated_at = now
+    session.commit()
+    first = version()
+    subjects[1].updated_at = now  # same second, no insert or delete: count and max are unchanged
+    session.commit()
+    assert version() != first
+    assert version() == version()
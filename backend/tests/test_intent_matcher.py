@@ -0,0 +1,51 @@
+# tests/test_intent_matcher.py
+import pytest
+from utils.intent_matcher import KeywordAutomaton, normalize
+
+def automaton(*phrases):
+    built = KeywordAutomaton()
+    for phrase in phrases:
+        built.add(phrase, phrase)
+    return built.build()
+
+def hits(built, text):
+    return [(text[start:end], value) for start, end, value in built.find(normalize(text))]
+
+def test_normalize_lowercases_and_collapses_separators():
+    assert normalize('  Head_of\tThe   Department ') == 'head of the department'
+
+def test_overlapping_phrases_use_failure_links():
+    built = automaton('he', 'she', 'his', 'hers')
+    # Classic Aho-Corasick example, restricted to whole words
+    assert hits(built, 'she said hers and his') == [('she', 'she'), ('hers', 'hers'), ('his', 'his')]
+    assert hits(built, 'ushers') == []
+
+@pytest.mark.parametrize('text, expected', [
+    ('who is the hod', ['hod']),
+    ('hods of cs', ['hods', 'cs']),
+    ('method', []),
+    ('hod_list', ['hod']),
+    ('hod, cs.', ['hod', 'cs']),
+    ('cs101 notes', ['cs101', 'notes']),
+    ('cs1010', []),
+])
+def test_only_whole_words_match(text, expected):
+    built = automaton('hod', 'hods', 'cs', 'cs101', 'notes')
+    assert [value for _, value in hits(built, text)] == expected
+
+def test_nested_and_multi_word_phrases_all_report():
+    built = automaton('head of department', 'department', 'head')
+    assert [value for _, value in hits(built, 'the Head of  Department')] == ['head', 'head of department', 'department']
+
+def test_repeated_mentions_are_each_reported():
+    built = automaton('cs')
+    assert len(hits(built, 'cs and cs')) == 2
+
+def test_empty_phrases_are_ignored_and_size_counts_states():
+    built = KeywordAutomaton()
+    built.add('', 'empty')
+    built.add(None, 'none')
+    assert len(built) == 1
+    built.add('ab', 'ab')
+    assert len(built.build()) == 3
+    assert list(built.find('')) == []
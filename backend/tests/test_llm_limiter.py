@@ -0,0 +1,131 @@
+# tests/test_llm_limiter.py
+import asyncio
+import pytest
+from utils.llm_limiter import ConcurrencyLimiter, LimitExceeded
+
+def make_limiter(max_concurrent=1, max_per_user=2, max_queue=2, queue_timeout=5):
+    return ConcurrencyLimiter(max_concurrent, max_per_user, max_queue, queue_timeout, 'test_limiter')
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_slot_is_taken_and_returned():
+    limiter = make_limiter()
+
+    async def main():
+        async with limiter.slot('alice'):
+            assert limiter.stats()['active'] == 1
+        assert limiter.stats()['active'] == 0
+
+    asyncio.run(main())
+    assert limiter._per_user == {}
+
+def test_per_user_limit_counts_queued_calls():
+    limiter = make_limiter(max_concurrent=1, max_per_user=2)
+
+    async def main():
+        await limiter.acquire('alice')
+        queued = asyncio.ensure_future(limiter.acquire('alice'))
+        await settle()
+        with pytest.raises(LimitExceeded) as refused:
+            await limiter.acquire('alice')
+        assert refused.value.status == 429 and refused.value.retry_after > 0
+        limiter.release('alice')
+        await queued
+        limiter.release('alice')
+
+    asyncio.run(main())
+    assert limiter.stats()['active'] == 0
+
+def test_full_queue_is_refused_with_503():
+    limiter = make_limiter(max_concurrent=1, max_queue=1)
+
+    async def main():
+        await limiter.acquire('a')
+        queued = asyncio.ensure_future(limiter.acquire('b'))
+        await settle()
+        with pytest.raises(LimitExceeded) as refused:
+            await limiter.acquire('c')
+        assert refused.value.status == 503
+        limiter.release('a')
+        await queued
+        limiter.release('b')
+
+    asyncio.run(main())
+
+def test_released_slot_goes_to_the_longest_waiter():
+    limiter = make_limiter(max_concurrent=1, max_per_user=5)
+    order = []
+
+    async def waiter(name):
+        await limiter.acquire(name)
+        order.append(name)
+
+    async def main():
+        await limiter.acquire('first')
+        tasks = [asyncio.ensure_future(waiter(name)) for name in ('b', 'c')]
+        await settle()
+        limiter.release('first')
+        await settle()
+        assert order == ['b']
+        limiter.release('b')
+        await asyncio.gather(*tasks)
+        limiter.release('c')
+
+    asyncio.run(main())
+    assert order == ['b', 'c']
+    assert limiter.stats()['active'] == 0
+
+def test_queue_timeout_frees_the_user():
+    limiter = make_limiter(max_concurrent=1, max_per_user=1, queue_timeout=0.05)
+
+    async def main():
+        await limiter.acquire('a')
+        with pytest.raises(LimitExceeded) as refused:
+            await limiter.acquire('b')
+        assert refused.value.status == 503
+        assert 'b' not in limiter._per_user and limiter.stats()['queued'] == 0
+        limiter.release('a')
+
+    asyncio.run(main())
+
+def test_cancelled_waiters_do_not_leak_per_user_counts():
+    limiter = make_limiter(max_concurrent=1, max_per_user=2, max_queue=10)
+
+    async def main():
+        await limiter.acquire('busy')
+        # More cancellations than the per-user limit: each must give its count back
+        for _ in range(3):
+            queued = asyncio.ensure_future(limiter.acquire('alice'))
+            await settle()
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+        assert 'alice' not in limiter._per_user and limiter.stats()['queued'] == 0
+        limiter.release('busy')
+        async with limiter.slot('alice'):
+            pass
+
+    asyncio.run(main())
+    assert limiter.stats()['active'] == 0
+
+def test_slot_granted_to_a_cancelled_waiter_is_given_back():
+    limiter = make_limiter(max_concurrent=1)
+
+    async def main():
+        await limiter.acquire('a')
+        queued = asyncio.ensure_future(limiter.acquire('b'))
+        await settle()
+        limiter.release('a')  # hands the slot to b ...
+        queued.cancel()       # ... which is cancelled before it can resume
+        try:
+            await queued
+        except asyncio.CancelledError:
+            pass
+        else:
+            limiter.release('b')  # some wait_for versions deliver the slot despite the cancel
+
+    asyncio.run(main())
+    assert limiter.stats()['active'] == 0
+    assert limiter._per_user == {}
@@ -0,0 +1,76 @@
+# tests/test_notes_index.py
+import threading
+import pytest
+from utils import notes_index
+from utils.notes_index import chunk_text, CHUNK_CHARS, CHUNK_OVERLAP
+
+def words(count):
+    return ' '.join(f"word{i:04d}" for i in range(count))
+
+def test_empty_and_short_text():
+    assert chunk_text('') == []
+    assert chunk_text('  one \n two\tthree ') == ['one two three']
+
+def test_chunks_respect_size_and_word_boundaries():
+    text = words(1000)
+    chunks = chunk_text(text)
+    assert len(chunks) > 1
+    vocabulary = set(text.split())
+    for chunk in chunks:
+        assert len(chunk) <= CHUNK_CHARS
+        assert set(chunk.split()) <= vocabulary  # no word split across chunks
+
+def test_consecutive_chunks_overlap_and_cover_everything():
+    text = words(1000)
+    chunks = chunk_text(text)
+    for previous, current in zip(chunks, chunks[1:]):
+        shared = set(previous.split()) & set(current.split())
+        assert shared and len(' '.join(sorted(shared))) <= CHUNK_OVERLAP
+    covered = set().union(*(chunk.split() for chunk in chunks))
+    assert covered == set(text.split())
+    assert chunks[-1].endswith('word0999')
+
+def test_unbroken_text_is_still_split():
+    chunks = chunk_text('x' * (CHUNK_CHARS * 2 + 10))
+    assert [len(chunk) for chunk in chunks] == [CHUNK_CHARS, CHUNK_CHARS, 10]
+
+@pytest.fixture
+def index(tmp_path, monkeypatch, make_pdf):
+    """An empty index in tmp_path; fresh thread-local connections, also for the background worker."""
+    monkeypatch.setattr(notes_index, 'INDEX_PATH', str(tmp_path / 'notes_index.sqlite3'))
+    monkeypatch.setattr(notes_index, '_local', threading.local())
+
+    def add(note_id, departmentcode, semester, *pages):
+        path = tmp_path / f"note{note_id}.pdf"
+        path.write_bytes(make_pdf(list(pages)))
+        return notes_index.index_note(note_id, str(path), departmentcode, semester, path.name, content_hash=f"hash{note_id}")
+    return add
+
+def hits(query, departmentcode, semester=None):
+    return [hit['note_id'] for hit in notes_index.search(query, departmentcode, semester)]
+
+def test_search_ranks_by_bm25_within_the_scope(index):
+    assert index(1, 'CS', 'S1', 'Recursion: a recursive function needs a base case.', 'Recursion unwinds the call stack.') == 1
+    index(2, 'CS', 'S1', 'Sorting algorithms such as quicksort and mergesort, with a word on recursion.')
+    index(3, 'ME', 'S1', 'Recursion recursion recursion in mechanical linkages.')
+    index(4, 'CS', 'S2', 'Recursion and more recursion for the second semester.')
+
+    assert hits('explain recursion', 'CS', 'S1') == [1, 2]  # the note about recursion outranks a passing mention
+    assert hits('quicksort', 'CS', 'S1') == [2]
+    assert set(hits('recursion', 'CS')) == {1, 2, 4}  # no semester: the whole department
+    assert hits('recursion', 'EE', 'S1') == []
+    assert hits('the notes', 'CS', 'S1') == []  # only stopwords
+    assert hits('recursion" OR departmentcode:ME (', 'CS', 'S1') == [1, 2]  # FTS5 syntax in input is inert
+
+def test_unchanged_note_is_not_reindexed(index):
+    assert index(1, 'CS', 'S1', 'Recursion basics.') == 1
+    assert index(1, 'CS', 'S1', 'Recursion basics.') is None
+    assert notes_index.indexed_note_ids() == {1}
+
+def test_schedule_removal_drops_the_notes_chunks(index):
+    index(1, 'CS', 'S1', 'Recursion basics.')
+    index(2, 'CS', 'S1', 'Recursion in sorting.')
+    notes_index.schedule_removal([1, None])
+    notes_index._jobs.join()
+    assert hits('recursion', 'CS', 'S1') == [2]
+    assert notes_index.indexed_note_ids() == {2}
@@ -0,0 +1,60 @@
+# tests/test_openrouter_client.py
+import json
+import pytest
+from aiohttp import web
+from utils import openrouter_client
+
+def sse(*events):
+    return ''.join(f"data: {event if isinstance(event, str) else json.dumps(event)}\n\n" for event in events)
+
+def delta(text):
+    return {'choices': [{'delta': {'content': text}}]}
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Serves a scripted SSE body from the client's own loop; set ``body['text']`` per test."""
+    client = openrouter_client.OpenRouterClient()
+    body = {'text': ''}
+
+    async def chat(request):
+        return web.Response(text=body['text'], content_type='text/event-stream')
+
+    async def start():
+        app = web.Application()
+        app.router.add_post('/api/v1/chat/completions', chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+    runner, port = client.submit(start()).result(timeout=5)
+    monkeypatch.setattr(openrouter_client, 'OPENROUTER_URL', f"http://127.0.0.1:{port}/api/v1/chat/completions")
+    yield client, body
+    client.submit(runner.cleanup()).result(timeout=5)
+    client.close()
+
+def test_stream_yields_deltas_until_done(upstream):
+    client, body = upstream
+    body['text'] = sse(delta('Hel'), {'choices': [{'delta': {'role': 'assistant'}}]}, delta('lo'), '[DONE]')
+    assert list(client.stream_chat({}, {})) == ['Hel', 'lo']
+
+@pytest.mark.parametrize('failure', [
+    {'error': {'message': 'provider overloaded', 'code': 502}, 'choices': [{'finish_reason': 'error'}]},
+    {'choices': [{'delta': {'content': ''}, 'finish_reason': 'error'}]},
+    {'choices': ['not an object']},
+    'not json',
+])
+def test_failure_after_partial_text_raises(upstream, failure):
+    client, body = upstream
+    body['text'] = sse(delta('partial '), failure, delta('never seen'), '[DONE]')
+    received = []
+    with pytest.raises(Exception, match='API request failed'):
+        for text in client.stream_chat({}, {}):
+            received.append(text)
+    assert received == ['partial ']
+
+def test_null_delta_is_skipped(upstream):
+    client, body = upstream
+    body['text'] = sse({'choices': [{'delta': None}]}, delta('ok'), '[DONE]')
+    assert list(client.stream_chat({}, {})) == ['ok']
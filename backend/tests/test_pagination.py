@@ -0,0 +1,69 @@
+# tests/test_pagination.py
+import pytest
+from models import User
+from utils.pagination import encode_cursor, decode_cursor, paginate, page_response, MAX_PAGE_SIZE
+
+def add_users(session, count):
+    for i in range(count):
+        session.add(User(
+            admission_number=f"U{i:03d}", email=f"u{i}@example.com", password='x',
+            username=f"user{i}", departmentcode='CS', role='student' if i % 2 else 'staff'
+        ))
+    session.commit()
+
+def collect_pages(app, query_string):
+    """All admission numbers reached by following next_cursor from the first page."""
+    seen = []
+    cursor = None
+    while True:
+        url = f"/?{query_string}" + (f"&cursor={cursor}" if cursor else '')
+        with app.test_request_context(url):
+            items, cursor, _ = paginate(User.query, User.admission_number)
+        seen.extend(user.admission_number for user in items)
+        if cursor is None:
+            return seen
+
+@pytest.mark.parametrize('value', [5, 'U007', [3, 'a'], None])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor(value)
+    assert '/' not in cursor and '+' not in cursor
+    assert decode_cursor(cursor) == value
+
+@pytest.mark.parametrize('cursor', ['not a cursor', '!!!', encode_cursor(1)[:-3] + '@'])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_pages_cover_every_row_once_in_key_order(app, session):
+    add_users(session, 7)
+    assert collect_pages(app, 'limit=3') == [f"U{i:03d}" for i in range(7)]
+
+def test_last_full_page_has_no_next_cursor(app, session):
+    add_users(session, 4)
+    with app.test_request_context('/?limit=4'):
+        items, next_cursor, total = paginate(User.query, User.admission_number)
+    assert len(items) == 4 and next_cursor is None and total == 4
+
+def test_total_counts_the_filtered_query_and_can_be_skipped(app, session):
+    add_users(session, 6)
+    with app.test_request_context('/?limit=2'):
+        items, next_cursor, total = paginate(User.query.filter_by(role='student'), User.admission_number)
+    assert [user.admission_number for user in items] == ['U001', 'U003']
+    assert total == 3
+    with app.test_request_context('/?limit=2&count=false'):
+        assert paginate(User.query, User.admission_number)[2] is None
+
+def test_limit_is_capped_and_must_be_positive(app, session):
+    add_users(session, 3)
+    with app.test_request_context(f"/?limit={MAX_PAGE_SIZE * 10}"):
+        items, next_cursor, _ = paginate(User.query, User.admission_number)
+    assert len(items) == 3 and next_cursor is None
+    with app.test_request_context('/?limit=0'):
+        with pytest.raises(ValueError):
+            paginate(User.query, User.admission_number)
+
+def test_page_response_shape(app, session):
+    add_users(session, 1)
+    body = page_response(User.query.all(), 'abc', None)
+    assert body['next_cursor'] == 'abc' and 'total' not in body
+    assert body['items'][0]['admission_number'] == 'U000'
@@ -0,0 +1,41 @@
+# tests/test_pdf_extract.py
+import pytest
+from utils.pdf_extract import extract_text, _spread_order
+
+def page_texts(count, width=200):
+    """Page n reads 'P<n>' padded to ``width`` characters."""
+    return [f"P{n:03d}".ljust(width, 'x') for n in range(1, count + 1)]
+
+def test_budget_bounds_pages_parsed_on_a_long_document(make_pdf):
+    result = extract_text(make_pdf(page_texts(300)), max_chars=5000)
+    assert result.page_count == 300
+    assert result.pages_parsed == 25
+    assert not result.complete
+    assert len(result.text) <= 5000
+    assert result.text.startswith('P001')
+
+def test_short_document_is_complete(make_pdf):
+    result = extract_text(make_pdf(page_texts(3)), max_chars=5000)
+    assert result.complete and result.pages_parsed == 3
+    assert [word[:4] for word in result.text.split()] == ['P001', 'P002', 'P003']
+
+def test_spread_shares_the_budget_across_the_document(make_pdf):
+    pages = page_texts(40)
+    pages[15] = pages[15].ljust(2000, 'y')  # page 16, visited last, overshoots the budget
+    result = extract_text(make_pdf(pages), max_chars=1000, strategy='spread')
+    markers = [word[:4] for word in result.text.split()]
+    # Visiting order is 21, 11, 31, 6, 16, ...; the overshooting page is cut, not the later pages
+    assert markers == ['P006', 'P011', 'P016', 'P021', 'P031']
+    assert len(result.text) <= 1000
+
+def test_page_range_is_one_based_and_inclusive(make_pdf):
+    result = extract_text(make_pdf(page_texts(10)), page_range=(3, 4))
+    assert [word[:4] for word in result.text.split()] == ['P003', 'P004']
+    assert result.complete
+
+def test_spread_order_prefixes_cover_the_range():
+    assert _spread_order(list(range(7))) == [3, 1, 5, 0, 2, 4, 6]
+
+def test_unknown_strategy_is_rejected(make_pdf):
+    with pytest.raises(ValueError):
+        extract_text(make_pdf(page_texts(1)), strategy='random')
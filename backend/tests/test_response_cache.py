@@ -0,0 +1,63 @@
+# tests/test_response_cache.py
+import itertools
+import types
+import pytest
+from utils import response_cache
+from utils.response_cache import TTLCache, normalize_message, data_version, chat_cache_key
+
+_prefixes = itertools.count()
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def make_cache(max_entries=3, ttl=10):
+    return TTLCache(max_entries, ttl, f"test_cache_{next(_prefixes)}")
+
+def test_get_returns_stored_value_until_it_expires(clock):
+    cache = make_cache()
+    cache.set('a', {'response': 'hi'})
+    clock[0] += 9.9
+    assert cache.get('a') == {'response': 'hi'}
+    clock[0] += 0.2
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = make_cache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+def test_set_refreshes_the_expiry(clock):
+    cache = make_cache()
+    cache.set('a', 1)
+    clock[0] += 8
+    cache.set('a', 2)
+    clock[0] += 8
+    assert cache.get('a') == 2
+
+def test_stats_report_hit_rate(clock):
+    cache = make_cache()
+    assert cache.stats()['hit_rate'] is None
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('missing')
+    assert cache.stats() == {'entries': 1, 'max_entries': 3, 'ttl': 10, 'hit_rate': 0.5}
+
+def test_equivalent_questions_share_a_key():
+    payload = {'model': 'm', 'max_tokens': 500, 'temperature': 0.7, 'messages': ['ignored']}
+    assert normalize_message('  What is  an OS?? ') == 'what is an os'
+    key = chat_cache_key('What is an OS?', payload, data_version('ctx'))
+    assert key == chat_cache_key('what is an os', dict(payload, messages=[]), data_version('ctx'))
+    assert key != chat_cache_key('what is an os', dict(payload, temperature=0), data_version('ctx'))
+    assert key != chat_cache_key('what is an os', payload, data_version('other ctx'))
+
+def test_data_version_depends_on_part_order_and_boundaries():
+    assert data_version('a', 'b') != data_version('b', 'a')
+    assert data_version('ab', None) != data_version('a', 'b')
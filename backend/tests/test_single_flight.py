@@ -0,0 +1,147 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+import pytest
+from utils.single_flight import SingleFlight
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight('test_flight')
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    def caller():
+        results.append(flight.run('key', work))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    while flight.in_flight('key') is None:
+        time.sleep(0.001)
+    followers = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(timeout=5)
+
+    assert calls == [1]
+    assert results == ['value'] * 5
+    assert flight.in_flight('key') is None
+
+def test_leader_exception_reaches_followers():
+    flight = SingleFlight('test_flight')
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def work():
+        started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    def caller():
+        try:
+            flight.run('key', work)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=caller)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+    assert errors == ['boom', 'boom']
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight('test_flight')
+    assert flight.run('key', lambda: 1) == 1
+    assert flight.run('key', lambda: 2) == 2
+
+def test_async_callers_on_separate_loops_share_one_call():
+    flight = SingleFlight('test_flight')
+    calls = []
+    results = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'value'
+
+    # Like Flask's async views: one event loop per request thread
+    run_threads(5, lambda: results.append(asyncio.run(flight.run_async('key', work))))
+    assert calls == [1]
+    assert results == ['value'] * 5
+
+def test_cancelled_leader_fails_followers():
+    flight = SingleFlight('test_flight')
+    follower_errors = []
+
+    async def work():
+        await asyncio.sleep(5)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.run_async('key', work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.run_async('key', work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        try:
+            await follower
+        except Exception as e:
+            follower_errors.append(e)
+
+    asyncio.run(main())
+    assert len(follower_errors) == 1
+    assert isinstance(follower_errors[0], RuntimeError)
+    assert flight.in_flight('key') is None
+
+def test_cancelled_follower_does_not_affect_leader_or_siblings():
+    flight = SingleFlight('test_flight')
+
+    async def main():
+        done = asyncio.Event()
+
+        async def work():
+            await done.wait()
+            return 'value'
+
+        leader = asyncio.ensure_future(flight.run_async('key', work))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.run_async('key', work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        followers[0].cancel()
+        await asyncio.sleep(0.01)
+        done.set()
+        with pytest.raises(asyncio.CancelledError):
+            await followers[0]
+        return await leader, await followers[1]
+
+    assert asyncio.run(main()) == ('value', 'value')
+    assert flight.in_flight('key') is None
+
+def test_finish_tolerates_a_settled_future():
+    flight = SingleFlight('test_flight')
+    future, leader = flight._join('key')
+    future.cancel()
+    flight._finish('key', future, 'value', None)
+    assert flight.in_flight('key') is None
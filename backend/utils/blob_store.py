@@ -0,0 +1,156 @@
+# utils/blob_store.py
+"""
+Content-addressed storage for uploads.
+
+Each upload is hashed while it streams to disk and stored once under
+uploads/blobs/<first two hex digits>/<sha256>. Notes, Timetable, Assignment
+and Requests rows keep their human-readable ``filename`` (used in URLs and as
+the download name) and point at the bytes through ``content_hash``. The
+``blobs`` table counts references, so identical uploads share one file and the
+file is removed when its last row goes away.
+
+A blob row is never deleted; releasing its last reference leaves it at
+refcount 0 and the file is unlinked later by file_cleanup, which re-checks the
+count under a row lock first. store_upload takes its reference (locking the
+row) before deciding whether the file is already on disk, so a re-upload of the
+same bytes either waits for a pending unlink or makes the cleanup skip the file.
+A file placed by a transaction that rolls back is queued for the same checked
+removal.
+
+Rows stored before blobs existed have ``content_hash`` NULL and keep being
+served from their original folder.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from collections import defaultdict, Counter
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from database import db
+from models import Blob
+
+logger = logging.getLogger(__name__)
+
+BLOBS_FOLDER = os.path.join(os.path.dirname(__file__), '../uploads/blobs')
+os.makedirs(BLOBS_FOLDER, exist_ok=True)
+
+CHUNK_SIZE = 64 * 1024
+
+def blob_name(content_hash):
+    """Path of a blob relative to BLOBS_FOLDER."""
+    return f"{content_hash[:2]}/{content_hash}"
+
+def blob_path(content_hash):
+    return os.path.join(BLOBS_FOLDER, content_hash[:2], content_hash)
+
+def stored_file(folder, filename, content_hash):
+    """(folder, name) holding an upload: its blob when hashed, else the legacy file in ``folder``."""
+    if content_hash:
+        return BLOBS_FOLDER, blob_name(content_hash)
+    return folder, filename
+
+def store_upload(file):
+    """
+    Streams an uploaded FileStorage into the store, hashing it on the way, and
+    takes a reference to the resulting blob. Returns the SHA-256 hex digest.
+    The reference is part of the caller's transaction and is kept on commit.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=BLOBS_FOLDER, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+
+        content_hash = digest.hexdigest()
+        # Lock the row before looking at the file so a pending cleanup cannot unlink it underneath us
+        _take_reference(content_hash, size)
+        path = blob_path(content_hash)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            logger.info(f"Upload deduplicated against blob {content_hash}")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            db.session.info.setdefault('placed_blobs', []).append(path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return content_hash
+
+def _take_reference(content_hash, size):
+    """Insert the blob row with one reference, or add one to an existing row, in a single upsert."""
+    if db.session.get_bind().dialect.name == 'mysql':
+        statement = mysql.insert(Blob).values(sha256=content_hash, size=size, refcount=1)
+        statement = statement.on_duplicate_key_update(refcount=Blob.refcount + 1)
+    else:
+        statement = sqlite.insert(Blob).values(sha256=content_hash, size=size, refcount=1)
+        statement = statement.on_conflict_do_update(index_elements=[Blob.sha256], set_={'refcount': Blob.refcount + 1})
+    db.session.execute(statement)
+
+def release(content_hashes):
+    """
+    Drops one reference per hash (repeats allowed, NULLs ignored). Returns the
+    paths of blobs left without references so the caller can pass them to
+    schedule_removal once the transaction has committed.
+    """
+    counts = Counter(content_hash for content_hash in content_hashes if content_hash)
+    if not counts:
+        return []
+
+    by_count = defaultdict(list)
+    for content_hash, count in counts.items():
+        by_count[count].append(content_hash)
+    for count, hashes in by_count.items():
+        Blob.query.filter(Blob.sha256.in_(hashes)).update({Blob.refcount: Blob.refcount - count}, synchronize_session=False)
+
+    orphaned = [content_hash for (content_hash,) in db.session.query(Blob.sha256).filter(Blob.sha256.in_(counts), Blob.refcount <= 0)]
+    return [blob_path(content_hash) for content_hash in orphaned]
+
+def is_blob_path(path):
+    return os.path.dirname(os.path.dirname(os.path.abspath(path))) == os.path.abspath(BLOBS_FOLDER)
+
+def remove_if_unreferenced(path):
+    """
+    Unlinks a blob file unless its row holds references. Runs in an app
+    context on the cleanup thread; the row lock is held across the unlink so
+    a concurrent store_upload of the same bytes waits and then re-places the
+    file. Returns True if the file was removed.
+    """
+    try:
+        refcount = db.session.query(Blob.refcount).filter_by(sha256=os.path.basename(path)).with_for_update().scalar()
+        if refcount is not None and refcount > 0:
+            logger.info(f"Blob {os.path.basename(path)} was referenced again; keeping it")
+            return False
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    finally:
+        db.session.rollback()
+
+@event.listens_for(Session, 'after_commit')
+def _keep_placed_blobs(session):
+    session.info.pop('placed_blobs', None)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_placed_blobs(session, transaction):
+    # Still set only if the outermost transaction ended without committing
+    if transaction.parent is None and session.info.get('placed_blobs'):
+        from utils.file_cleanup import schedule_removal  # file_cleanup imports this module
+        schedule_removal(session.info.pop('placed_blobs'))
+
+def release_upload(folder, filename, content_hash):
+    """Paths to remove once a row owning an upload is deleted: its blob if this was the last reference, or the legacy file."""
+    if content_hash:
+        return release([content_hash])
+    return [os.path.join(folder, filename)] if filename else []
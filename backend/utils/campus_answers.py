@@ -0,0 +1,182 @@
+# utils/campus_answers.py
+"""
+Deterministic answers to common factual campus questions.
+
+Only questions phrased as one of the templates below are answered locally:
+the whole question must read like "who is the HOD of CS", "how many students
+are there in S6 CS" or "list the subjects for S3", i.e. a count or list lead
+directly attached to the topic, optionally scoped by departments and
+semesters before the topic or after "of/in/for". Every other word in the
+scope must be filler ("the", "department", "and", ...), so "what does HOD
+stand for" or "how many students fail the exams" go to the LLM. Answers come
+from aggregate queries over the live tables, so they are exact.
+"""
+import re
+from sqlalchemy import func
+from database import db
+from models import User, Department, Subject
+from utils import intent_matcher
+
+COUNT_LEAD = r"(?:how many|(?:what is |what's )?the (?:total )?number of|(?:total )?number of|count of)"
+PREFIX = r"(?:the |all |all the )?(?:(?P<prefix>.+?) )?"
+TAIL = r"(?: (?:are there|are there in total|in total|do we have|are registered|are enrolled|are offered))?"
+SCOPE = r"(?: (?:of|in|for|from) (?P<scope>.+?))?"
+
+HOD_TOPIC = r"(?:hods?|heads? of (?:the )?departments?|heads?)"
+STAFF_TOPIC = r"(?:staff(?: members)?|teachers|faculty(?: members)?)"
+
+# Words a scope may contain besides department and semester names
+SCOPE_FILLER = {'the', 'a', 'all', 'and', 'department', 'departments', 'dept', 'semester', 'sem', 'college', 'campus', 'our'}
+
+def _template(lead, topic):
+    return re.compile(rf"{lead} {PREFIX}{topic}{TAIL}{SCOPE}{TAIL}")
+
+def _scope(departments, semesters):
+    return ' '.join(semesters + departments)
+
+def _plural(count, noun):
+    return noun if count == 1 else f"{noun}s"
+
+def _count_by_department(query, department_column, departments, noun, scope):
+    if departments:
+        query = query.filter(department_column.in_(departments))
+    rows = query.with_entities(department_column, func.count()).group_by(department_column).order_by(department_column).all()
+    total = sum(count for _, count in rows)
+    if departments and len(departments) == 1:
+        return f"There {'is' if total == 1 else 'are'} {total} {_plural(total, noun)} in {scope}."
+    breakdown = ", ".join(f"{code}: {count}" for code, count in rows)
+    suffix = f" ({breakdown})" if breakdown else ""
+    scope_text = f" in {scope}" if scope else ""
+    return f"There {'is' if total == 1 else 'are'} {total} {_plural(total, noun)}{scope_text} in total{suffix}."
+
+def _list_hods(departments, semesters):
+    if semesters:
+        return None  # staff are not assigned to semesters
+    query = db.session.query(User.departmentcode, Department.departmentname, User.username, User.email) \
+        .join(Department, User.departmentcode == Department.departmentcode) \
+        .filter(User.role == 'hod')
+    if departments:
+        query = query.filter(User.departmentcode.in_(departments))
+    rows = query.order_by(User.departmentcode, User.username).all()
+    if not rows:
+        return f"No HOD is recorded for {', '.join(departments) or 'any department'}."
+    return "\n".join(f"The HOD of {name} ({code}) is {username} ({email})." for code, name, username, email in rows)
+
+def _count_staff(departments, semesters):
+    if semesters:
+        return None  # staff are not assigned to semesters
+    query = User.query.filter(User.role.in_(['staff', 'hod']))
+    return _count_by_department(query, User.departmentcode, departments, 'staff member', _scope(departments, []))
+
+def _list_staff(departments, semesters):
+    if semesters:
+        return None  # staff are not assigned to semesters
+    if not departments:
+        return None  # the whole campus roster is too long for a chat reply
+    rows = db.session.query(User.departmentcode, User.username, User.role, User.email) \
+        .filter(User.role.in_(['staff', 'hod']), User.departmentcode.in_(departments)) \
+        .order_by(User.departmentcode, User.username).all()
+    if not rows:
+        return f"No staff are recorded for {', '.join(departments)}."
+    lines = [f"Staff in {', '.join(departments)}:"]
+    lines.extend(f"- {username} ({role.upper() if role == 'hod' else role}, {code}, {email})" for code, username, role, email in rows)
+    return "\n".join(lines)
+
+def _count_students(departments, semesters):
+    query = User.query.filter(User.role == 'student')
+    if semesters:
+        query = query.filter(User.semester.in_(semesters))
+    return _count_by_department(query, User.departmentcode, departments, 'student', _scope(departments, semesters))
+
+def _list_subjects(departments, semesters):
+    if not departments and not semesters:
+        return None
+    query = db.session.query(Subject.departmentcode, Subject.semester, Subject.subject_code, Subject.subject_name, Subject.credits)
+    if departments:
+        query = query.filter(Subject.departmentcode.in_(departments))
+    if semesters:
+        query = query.filter(Subject.semester.in_(semesters))
+    rows = query.order_by(Subject.departmentcode, Subject.semester, Subject.subject_code).all()
+    scope = _scope(departments, semesters)
+    if not rows:
+        return f"No subjects are recorded for {scope}."
+    lines = [f"Subjects for {scope}:"]
+    lines.extend(f"- {code} {name} ({semester} {dept}, {credits} credits)" for dept, semester, code, name, credits in rows)
+    return "\n".join(lines)
+
+def _count_subjects(departments, semesters):
+    query = Subject.query
+    if semesters:
+        query = query.filter(Subject.semester.in_(semesters))
+    return _count_by_department(query, Subject.departmentcode, departments, 'subject', _scope(departments, semesters))
+
+def _list_departments(departments, semesters):
+    if departments or semesters:
+        return None
+    rows = Department.query.with_entities(Department.departmentcode, Department.departmentname) \
+        .order_by(Department.departmentcode).all()
+    if not rows:
+        return "No departments are recorded yet."
+    return "The departments are: " + ", ".join(f"{name} ({code})" for code, name in rows) + "."
+
+def _count_departments(departments, semesters):
+    if departments or semesters:
+        return None
+    total = Department.query.count()
+    return f"There {'is' if total == 1 else 'are'} {total} {_plural(total, 'department')}."
+
+# Question templates, tried in order; a handler takes (departments, semesters) and may return None
+TEMPLATES = [
+    (_template(r"(?:who is|who's|who are|list|name)", HOD_TOPIC), _list_hods),
+    (_template(COUNT_LEAD, STAFF_TOPIC), _count_staff),
+    (_template(r"(?:who are|list)", STAFF_TOPIC), _list_staff),
+    (_template(COUNT_LEAD, r"students"), _count_students),
+    (_template(r"(?:list|what are|name)", r"subjects"), _list_subjects),
+    (_template(COUNT_LEAD, r"subjects"), _count_subjects),
+    (_template(r"(?:list|what are|name)", r"departments"), _list_departments),
+    (_template(COUNT_LEAD, r"departments"), _count_departments),
+]
+
+def _question(message):
+    """Lowercased question with whitespace collapsed and a trailing '?', '.' or '!' removed."""
+    text = intent_matcher.normalize(message).rstrip('?!. ')
+    return text[len('please '):] if text.startswith('please ') else text
+
+def _scope_entities(*segments):
+    """
+    (departments, semesters) named by the scope segments of a template match,
+    or None when a segment holds anything besides those names and filler.
+    """
+    departments, semesters = [], []
+    automaton = intent_matcher.get_automaton()
+    for segment in segments:
+        if not segment:
+            continue
+        text = segment.replace(',', ' ')
+        covered = [False] * len(text)
+        for start, end, (kind, value) in automaton.find(text):
+            if kind in ('department', 'department_code'):
+                found = departments
+            elif kind == 'semester':
+                found = semesters
+            else:
+                continue
+            covered[start:end] = [True] * (end - start)
+            if value not in found:
+                found.append(value)
+        leftover = ''.join(' ' if hit else char for char, hit in zip(text, covered))
+        if not set(leftover.split()) <= SCOPE_FILLER:
+            return None
+    return departments, semesters
+
+def answer(message, message_match):
+    """Exact answer to a templated campus question, or None when the LLM should handle it."""
+    if not message_match.intents or message_match.subjects or message_match.note_subjects:
+        return None
+    question = _question(message)
+    for pattern, handler in TEMPLATES:
+        found = pattern.fullmatch(question)
+        if found:
+            scope = _scope_entities(found.group('prefix'), found.group('scope'))
+            return handler(*scope) if scope is not None else None
+    return None
@@ -0,0 +1,161 @@
+# utils/campus_context.py
+"""
+Precomputed campus snapshots for the chatbot's database context.
+
+For every department (from the Department table) the HOD, a staff and student
+sample, subjects and the latest notes and timetables are formatted once into
+context lines; a '*' snapshot holds the same sections across all departments.
+Building a message's context is then a dictionary lookup.
+
+Snapshots are rebuilt lazily, with one ranked query per section, after a
+commit that wrote users, departments, subjects, notes or timetables
+(including bulk updates/deletes). Those events only reach this process, so
+CAMPUS_CONTEXT_TTL bounds how stale another worker's snapshots can get.
+"""
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from database import db
+from models import User, Department, Notes, Timetable, Subject
+
+logger = logging.getLogger(__name__)
+
+CAMPUS_CONTEXT_TTL = float(os.getenv('CAMPUS_CONTEXT_TTL', 300))
+SAMPLE_SIZE = 3
+
+TRACKED_MODELS = (User, Department, Notes, Timetable, Subject)
+ALL_DEPARTMENTS = '*'
+
+_snapshots = None
+_built_at = 0.0
+_built_generation = -1
+_generation = 0
+_lock = threading.Lock()
+
+def invalidate():
+    """Mark the snapshots stale; the next lookup rebuilds them."""
+    global _generation
+    with _lock:
+        _generation += 1
+
+def generation():
+    """Changes whenever the snapshots are invalidated; derived caches compare against it."""
+    with _lock:
+        return _generation
+
+def snapshots():
+    """Department code -> section name -> formatted context lines, rebuilt when stale."""
+    global _snapshots, _built_at, _built_generation
+    with _lock:
+        if _snapshots is None or _built_generation != _generation or time.monotonic() - _built_at > CAMPUS_CONTEXT_TTL:
+            generation = _generation
+            start_time = time.perf_counter()
+            _snapshots = _build_snapshots()
+            _built_at = time.monotonic()
+            _built_generation = generation
+            logger.info(f"Campus context snapshots rebuilt for {len(_snapshots) - 1} departments in {time.perf_counter() - start_time:.3f}s")
+        return _snapshots
+
+def _top_per_department(columns, order_by, limit, *criteria):
+    """The first ``limit`` rows of each department by ``order_by``, in one windowed query."""
+    rank = func.row_number().over(partition_by=columns[0], order_by=order_by).label('rank')
+    ranked = db.session.query(*columns, rank).filter(*criteria).subquery()
+    return db.session.query(ranked).filter(ranked.c.rank <= limit).order_by(ranked.c.departmentcode, ranked.c.rank).all()
+
+def _build_snapshots():
+    departments = Department.query.order_by(Department.departmentcode).all()
+    result = {
+        department.departmentcode: {
+            'hods': [], 'staff': [], 'students': [], 'subjects': [], 'notes': [], 'timetables': [],
+            'departments': [f"Department: {department.departmentcode}, Name: {department.departmentname}"]
+        }
+        for department in departments
+    }
+    user_columns = [User.departmentcode, User.username, User.admission_number, User.email, User.role, User.semester, User.batch]
+
+    for h in _top_per_department(user_columns, User.admission_number, 1, User.role == 'hod'):
+        result[h.departmentcode]['hods'].append(f"HOD of {h.departmentcode}: {h.username} (ID: {h.admission_number}, Email: {h.email})")
+    for s in _top_per_department(user_columns, User.admission_number, SAMPLE_SIZE, User.role.in_(['staff', 'hod'])):
+        result[s.departmentcode]['staff'].append(
+            f"Staff: {s.username} (ID: {s.admission_number}, Role: {s.role}, Dept: {s.departmentcode}, Email: {s.email})"
+        )
+    for s in _top_per_department(user_columns, User.admission_number, SAMPLE_SIZE, User.role == 'student'):
+        result[s.departmentcode]['students'].append(
+            f"Student: {s.username} (ID: {s.admission_number}, Dept: {s.departmentcode}, Semester: {s.semester or 'N/A'}, Batch: {s.batch or 'N/A'})"
+        )
+    subject_columns = [Subject.departmentcode, Subject.subject_code, Subject.subject_name, Subject.semester, Subject.credits]
+    for s in _top_per_department(subject_columns, (Subject.semester, Subject.subject_code), SAMPLE_SIZE):
+        result[s.departmentcode]['subjects'].append(
+            f"Subject: {s.subject_code}, Name: {s.subject_name}, Dept: {s.departmentcode}, Semester: {s.semester}, Credits: {s.credits}"
+        )
+    for n in _top_per_department([Notes.departmentcode, Notes.filename, Notes.semester, Notes.uploaded_at], Notes.uploaded_at.desc(), SAMPLE_SIZE):
+        result[n.departmentcode]['notes'].append(f"Note: {n.filename}, Semester: {n.semester}, Uploaded: {n.uploaded_at}")
+    for t in _top_per_department([Timetable.departmentcode, Timetable.filename, Timetable.semester, Timetable.uploaded_at], Timetable.uploaded_at.desc(), SAMPLE_SIZE):
+        result[t.departmentcode]['timetables'].append(f"Timetable: {t.filename}, Semester: {t.semester}, Uploaded: {t.uploaded_at}")
+
+    # Campus-wide view for questions that name no department
+    result[ALL_DEPARTMENTS] = {
+        section: [line for snapshot in list(result.values()) for line in snapshot[section]][:1 if section == 'hods' else SAMPLE_SIZE]
+        for section in ('hods', 'staff', 'students', 'subjects', 'notes', 'timetables', 'departments')
+    }
+    return result
+
+def build_context(message_match):
+    """Campus context for a message's intent_matcher match, or None when it asks about nothing on campus."""
+    intents = message_match.intents
+    if not intents:
+        return None
+
+    departments = snapshots()
+    dept_code = next((code for code in message_match.departments if code in departments), None)
+    snapshot = departments[dept_code or ALL_DEPARTMENTS]
+    context_lines = ["Campus Database Context:"]
+
+    if 'hod' in intents:
+        if snapshot['hods']:
+            context_lines.append("Heads of Departments:")
+            context_lines.append("\n".join(snapshot['hods']))
+        else:
+            context_lines.append(f"No HOD found for {dept_code or 'any department'}.")
+    if 'staff' in intents:
+        context_lines.append("Staff (Sample):")
+        context_lines.append("\n".join(snapshot['staff']))
+    if 'department' in intents and 'hod' not in intents:
+        context_lines.append("Departments:")
+        context_lines.append("\n".join(snapshot['departments']))
+    if 'student' in intents:
+        context_lines.append("Students (Sample):")
+        context_lines.append("\n".join(snapshot['students']))
+    if 'subject' in intents:
+        context_lines.append("Subjects (Sample):")
+        context_lines.append("\n".join(snapshot['subjects']))
+    if 'notes' in intents:
+        context_lines.append("Notes (Sample):")
+        context_lines.append("\n".join(snapshot['notes']))
+    if 'timetable' in intents:
+        context_lines.append("Timetables (Sample):")
+        context_lines.append("\n".join(snapshot['timetables']))
+    return "\n".join(context_lines)
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    if any(isinstance(obj, TRACKED_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['campus_context_dirty'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        if issubclass(orm_execute_state.bind_mapper.class_, TRACKED_MODELS):
+            orm_execute_state.session.info['campus_context_dirty'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('campus_context_dirty', False):
+        invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('campus_context_dirty', None)
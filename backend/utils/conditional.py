@@ -0,0 +1,54 @@
+# utils/conditional.py
+import hashlib
+from flask import request, make_response
+from sqlalchemy import func
+from database import db
+
+CACHE_CONTROL = 'private, no-cache'
+
+def _epoch_seconds(column):
+    """``column`` as seconds since the epoch, in the session's SQL dialect."""
+    if db.session.get_bind().dialect.name == 'mysql':
+        return func.unix_timestamp(column)
+    return func.strftime('%s', column)
+
+def scope_version(timestamp_column, *criteria, id_column=None):
+    """
+    Cheap validator for the rows matching ``criteria``: row count, latest
+    timestamp, the sum of all row timestamps and (for integer keys) the sum of
+    ids, from one aggregate query that never loads the rows themselves.
+
+    The timestamp sum catches edits to several rows within the same second,
+    which leave the count and the latest timestamp unchanged. Timestamps have
+    one-second resolution, so a second edit to a row already stamped in the
+    current second can still go unseen for up to a second.
+    """
+    columns = [func.count(), func.max(timestamp_column), func.coalesce(func.sum(_epoch_seconds(timestamp_column)), 0)]
+    if id_column is not None:
+        columns.append(func.coalesce(func.sum(id_column), 0))
+    row = db.session.query(*columns).select_from(timestamp_column.class_).filter(*criteria).one()
+    return ':'.join('' if value is None else str(value) for value in row)
+
+def make_etag(*versions):
+    """
+    Combine scope versions with the endpoint and query string into a strong
+    ETag value. Versions may be None (e.g. a token without a departmentcode).
+    """
+    parts = [str(version) if version is not None else '' for version in versions]
+    key = '|'.join([request.endpoint or '', request.query_string.decode('utf-8', 'replace'), *parts])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def is_not_modified(etag):
+    """True when the client's If-None-Match already holds this ETag."""
+    return request.if_none_match.contains_weak(etag)
+
+def not_modified(etag):
+    """Empty 304 response for a matching conditional GET."""
+    response = make_response('', 304)
+    return with_etag(response, etag)
+
+def with_etag(response, etag):
+    """Attach the ETag and ask clients to revalidate on every use."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,57 @@
+# utils/file_cleanup.py
+import logging
+import os
+import queue
+import threading
+from flask import current_app, has_app_context
+from utils.blob_store import is_blob_path, remove_if_unreferenced
+
+logger = logging.getLogger(__name__)
+
+_pending = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+def schedule_removal(paths):
+    """
+    Queue files for deletion on a background thread so request handlers never
+    block on filesystem unlinks. Call only after the owning rows are committed.
+    Blob files are re-checked against their row before unlinking, which needs
+    the calling app's context.
+    """
+    paths = [path for path in paths if path]
+    if not paths:
+        return
+    app = current_app._get_current_object() if has_app_context() else None
+    _ensure_worker()
+    _pending.put((app, paths))
+    logger.info(f"Scheduled {len(paths)} files for background removal")
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_remove_pending, name='file-cleanup', daemon=True)
+            _worker.start()
+
+def _remove_pending():
+    while True:
+        app, paths = _pending.get()
+        removed = 0
+        for path in paths:
+            try:
+                if is_blob_path(path):
+                    if app is None:
+                        logger.error(f"Not removing blob {path}: scheduled outside an app context")
+                        continue
+                    with app.app_context():
+                        removed += remove_if_unreferenced(path)
+                else:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove file {path}: {str(e)}")
+        logger.debug(f"Background cleanup removed {removed} of {len(paths)} files")
+        _pending.task_done()
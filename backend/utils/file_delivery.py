@@ -0,0 +1,63 @@
+# utils/file_delivery.py
+"""
+Sends uploaded files either from the Python worker or through the front proxy.
+
+FILE_DELIVERY_MODE selects how the bytes are delivered once a route has
+authorized the download:
+
+* ``direct`` (default): Flask streams the file. Range and If-Range requests are
+  answered with 206 partial content, so interrupted downloads can resume.
+* ``x-accel-redirect``: nginx serves the file from an internal location.
+  FILE_DELIVERY_ACCEL_PREFIX is mapped onto the uploads directory, e.g.::
+
+      location /protected_uploads/ {
+          internal;
+          alias /srv/campus-connect/backend/uploads/;
+      }
+
+* ``x-sendfile``: Apache (mod_xsendfile) or lighttpd serves the absolute path.
+
+In both proxy modes the proxy handles Range/If-Range itself.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import current_app, Response, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+UPLOADS_ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '../uploads'))
+
+DELIVERY_MODES = ('direct', 'x-accel-redirect', 'x-sendfile')
+
+def send_upload(folder, filename, download_name=None):
+    """Send ``filename`` from an uploads ``folder`` as an attachment using the configured delivery mode."""
+    mode = current_app.config.get('FILE_DELIVERY_MODE', 'direct')
+    download_name = download_name or filename
+
+    if mode == 'direct':
+        return send_from_directory(folder, filename, as_attachment=True, download_name=download_name, conditional=True)
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"Unknown FILE_DELIVERY_MODE: {mode}")
+
+    path = safe_join(os.path.realpath(folder), filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    response = Response(status=200, mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream')
+    if mode == 'x-sendfile':
+        response.headers['X-Sendfile'] = path
+    else:
+        prefix = current_app.config.get('FILE_DELIVERY_ACCEL_PREFIX', '/protected_uploads').rstrip('/')
+        relative_path = os.path.relpath(path, UPLOADS_ROOT).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(relative_path)}"
+    response.headers['Content-Disposition'] = _attachment_header(download_name)
+    return response
+
+def _attachment_header(download_name):
+    try:
+        download_name.encode('ascii')
+        escaped = download_name.replace('\\', '\\\\').replace('"', '\\"')
+        return f'attachment; filename="{escaped}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(download_name)}"
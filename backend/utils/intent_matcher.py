@@ -0,0 +1,167 @@
+# utils/intent_matcher.py
+"""
+Single-pass intent and entity detection for chatbot messages.
+
+An Aho-Corasick automaton is compiled from the campus keywords, department
+codes and names, subject codes and names, notes catalog subject names and
+semester codes. One scan of the lowercased message yields every whole-word
+hit, from which the intents (hod, staff, notes, ...) and entities
+(departments, subjects, semesters) are read off.
+
+Department codes are often ordinary words ("me" for ME), so a code only counts
+when it is written in uppercase or follows "of", "in" or "for"; department
+names match in any case.
+
+The automaton is rebuilt together with the campus context snapshots, i.e.
+after commits that write those tables or once CAMPUS_CONTEXT_TTL passes.
+"""
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from models import Department, Subject, Notes
+from utils import campus_context
+
+logger = logging.getLogger(__name__)
+
+# Intent -> phrases that signal it
+INTENT_PHRASES = {
+    'hod': ['hod', 'hods', 'head of department', 'head of the department'],
+    'staff': ['staff', 'teacher', 'teachers', 'faculty'],
+    'department': ['department', 'departments'],
+    'student': ['student', 'students'],
+    'subject': ['subject', 'subjects'],
+    'notes': ['notes'],
+    'timetable': ['timetable', 'timetables', 'time table'],
+    'campus': ['campus', 'college'],
+}
+
+CODE_PREPOSITIONS = {'of', 'in', 'for'}
+
+MessageMatch = namedtuple('MessageMatch', ['intents', 'departments', 'subjects', 'note_subjects', 'semesters'])
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercase phrases, reporting whole-word matches."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def __len__(self):
+        return len(self._goto)
+
+    def add(self, phrase, value):
+        phrase = normalize(phrase or '')
+        if not phrase:
+            return
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append((len(phrase), value))
+
+    def build(self):
+        """Compute failure links breadth-first; call once after every add()."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_node] = target if target != next_node else 0
+                self._out[next_node] = self._out[next_node] + self._out[self._fail[next_node]]
+        return self
+
+    def find(self, text):
+        """(start, end, value) for every whole-word occurrence in already-normalized text."""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, value in self._out[node]:
+                start, end = index - length + 1, index + 1
+                if _word_edge(text, start - 1) and _word_edge(text, end):
+                    yield start, end, value
+
+def normalize(text):
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+def _word_edge(text, index):
+    return index < 0 or index >= len(text) or not (text[index].isalnum() or text[index] == '_')
+
+def _build_automaton():
+    automaton = KeywordAutomaton()
+    for intent, phrases in INTENT_PHRASES.items():
+        for phrase in phrases:
+            automaton.add(phrase, ('intent', intent))
+    for code, name in Department.query.with_entities(Department.departmentcode, Department.departmentname):
+        automaton.add(code, ('department_code', code))
+        automaton.add(name, ('department', code))
+    for code, name in Subject.query.with_entities(Subject.subject_code, Subject.subject_name):
+        automaton.add(code, ('subject', code))
+        automaton.add(name, ('subject', code))
+    for (subject_name,) in Notes.query.with_entities(Notes.subject_name).filter(Notes.subject_name.isnot(None)).distinct():
+        automaton.add(subject_name, ('note_subject', subject_name))
+    for number in range(10):
+        automaton.add(f"s{number}", ('semester', f"S{number}"))
+    return automaton.build()
+
+_automaton = None
+_built_generation = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+def get_automaton():
+    global _automaton, _built_generation, _built_at
+    with _lock:
+        generation = campus_context.generation()
+        if _automaton is None or _built_generation != generation or time.monotonic() - _built_at > campus_context.CAMPUS_CONTEXT_TTL:
+            start_time = time.perf_counter()
+            _automaton = _build_automaton()
+            _built_generation = generation
+            _built_at = time.monotonic()
+            logger.info(f"Intent matcher rebuilt with {len(_automaton)} states in {time.perf_counter() - start_time:.3f}s")
+        return _automaton
+
+def _names_department(original, text, start, end):
+    """Whether a department code hit at text[start:end] is meant as one (see module docstring)."""
+    if original[start:end].isupper():
+        return True
+    previous = text[:start].rstrip(' ,').rsplit(' ', 1)[-1]
+    return previous in CODE_PREPOSITIONS
+
+def match(message):
+    """Intents and entities named in a message. Entity lists keep first-mention order; note subjects are longest first."""
+    original = ' '.join((message or '').replace('_', ' ').split())
+    text = original.lower()
+    if len(text) != len(original):
+        original = text  # lowercasing changed offsets (rare non-ASCII); rely on prepositions only
+    intents = set()
+    found = {'department': [], 'subject': [], 'note_subject': [], 'semester': []}
+    for start, end, (kind, value) in get_automaton().find(text):
+        if kind == 'department_code':
+            if not _names_department(original, text, start, end):
+                continue
+            kind = 'department'
+        if kind == 'intent':
+            intents.add(value)
+        elif value not in found[kind]:
+            found[kind].append(value)
+    return MessageMatch(
+        intents,
+        found['department'],
+        found['subject'],
+        sorted(found['note_subject'], key=len, reverse=True),
+        found['semester']
+    )
@@ -0,0 +1,128 @@
+# utils/llm_limiter.py
+"""
+Concurrency limit and bounded wait queue for outbound LLM calls.
+
+At most LLM_MAX_CONCURRENT calls run at once per worker process, and at most
+LLM_MAX_PER_USER per user (running or queued). Callers beyond the global limit
+wait in a FIFO queue of at most LLM_MAX_QUEUE entries for up to
+LLM_QUEUE_TIMEOUT seconds. Anything beyond that is refused at once with
+LimitExceeded, which routes turn into a 429 (per-user) or 503 (overloaded)
+response carrying Retry-After, so a traffic spike cannot tie up every worker
+for the full upstream timeout.
+
+Slots are handed over through concurrent.futures.Future objects, so callers on
+different event loops (one per Flask async view) share the same limiter.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from utils import metrics
+
+LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', 8))
+LLM_MAX_PER_USER = int(os.getenv('LLM_MAX_PER_USER', 2))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', 32))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 10))
+LLM_RETRY_AFTER = int(os.getenv('LLM_RETRY_AFTER', 5))
+
+class LimitExceeded(Exception):
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent, max_per_user, max_queue, queue_timeout, metric_prefix):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.metric_prefix = metric_prefix
+        self._active = 0
+        self._per_user = defaultdict(int)
+        self._waiters = deque()
+        self._peak_queue = 0
+        self._lock = threading.Lock()
+
+    async def acquire(self, user=None):
+        """Take a slot, waiting in the queue if needed; raises LimitExceeded when refused."""
+        start_time = time.perf_counter()
+        with self._lock:
+            if user is not None and self._per_user[user] >= self.max_per_user:
+                metrics.increment(f'{self.metric_prefix}.rejected_user')
+                raise LimitExceeded("You have too many questions in progress. Please wait for an answer.", 429, LLM_RETRY_AFTER)
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                self._per_user[user] += 1
+                metrics.observe(f'{self.metric_prefix}.wait_seconds', 0.0)
+                return
+            if len(self._waiters) >= self.max_queue:
+                metrics.increment(f'{self.metric_prefix}.rejected_overload')
+                raise LimitExceeded("The assistant is busy right now. Try again shortly.", 503, LLM_RETRY_AFTER)
+            waiter = concurrent.futures.Future()
+            self._waiters.append(waiter)
+            self._per_user[user] += 1
+            self._peak_queue = max(self._peak_queue, len(self._waiters))
+
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(waiter), self.queue_timeout)
+        except BaseException as e:
+            # Timed out, or the waiting task was cancelled (e.g. the client disconnected)
+            with self._lock:
+                # cancel() fails if release() already handed us the slot
+                granted = not waiter.cancel()
+                if not granted:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    self._release_user(user)
+            if not isinstance(e, asyncio.TimeoutError):
+                if granted:
+                    self.release(user)
+                metrics.increment(f'{self.metric_prefix}.cancelled')
+                raise
+            if not granted:
+                metrics.increment(f'{self.metric_prefix}.queue_timeouts')
+                raise LimitExceeded("The assistant is busy right now. Try again shortly.", 503, LLM_RETRY_AFTER)
+            # Handed the slot right at the deadline; keep it
+        metrics.increment(f'{self.metric_prefix}.queued')
+        metrics.observe(f'{self.metric_prefix}.wait_seconds', time.perf_counter() - start_time)
+
+    def release(self, user=None):
+        """Give a slot back, handing it straight to the longest-waiting caller."""
+        with self._lock:
+            self._release_user(user)
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(True)
+                    return
+            self._active -= 1
+
+    def _release_user(self, user):
+        self._per_user[user] -= 1
+        if self._per_user[user] <= 0:
+            del self._per_user[user]
+
+    @asynccontextmanager
+    async def slot(self, user=None):
+        await self.acquire(user)
+        try:
+            yield
+        finally:
+            self.release(user)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': self._active,
+                'queued': len(self._waiters),
+                'peak_queued': self._peak_queue,
+                'max_concurrent': self.max_concurrent,
+                'max_per_user': self.max_per_user,
+                'max_queue': self.max_queue
+            }
+
+llm_limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENT, LLM_MAX_PER_USER, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT, 'llm_limiter')
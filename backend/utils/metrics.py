@@ -0,0 +1,44 @@
+# utils/metrics.py
+import threading
+from collections import defaultdict, deque
+
+# Recent samples kept per timing for percentiles
+TIMING_SAMPLES = 1000
+
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': deque(maxlen=TIMING_SAMPLES)})
+_lock = threading.Lock()
+
+def increment(name, amount=1):
+    """Add ``amount`` to a process-wide counter."""
+    with _lock:
+        _counters[name] += amount
+
+def observe(name, seconds):
+    """Record one duration sample for a timing."""
+    with _lock:
+        timing = _timings[name]
+        timing['count'] += 1
+        timing['total'] += seconds
+        timing['max'] = max(timing['max'], seconds)
+        timing['samples'].append(seconds)
+
+def snapshot():
+    """Current value of every counter, for the metrics endpoint."""
+    with _lock:
+        return dict(_counters)
+
+def timings():
+    """Count, mean, max and recent p50/p95 of every timing, in seconds."""
+    with _lock:
+        result = {}
+        for name, timing in _timings.items():
+            samples = sorted(timing['samples'])
+            result[name] = {
+                'count': timing['count'],
+                'mean': timing['total'] / timing['count'],
+                'max': timing['max'],
+                'p50': samples[len(samples) // 2],
+                'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            }
+        return result
@@ -0,0 +1,184 @@
+# utils/notes_index.py
+"""
+Full-text index over uploaded notes for chatbot retrieval.
+
+Note text is split into overlapping chunks and stored in an SQLite FTS5 table,
+ranked with BM25. The index is derived data: it lives beside the PDF text
+cache and can be rebuilt at any time with ``python reindex_notes.py``.
+
+Upload and delete routes call schedule_indexing / schedule_removal after their
+commit; a background thread extracts and indexes the PDF so requests never
+wait on parsing.
+"""
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from utils import metrics
+from utils.pdf_extract import extract_text
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.getenv('NOTES_INDEX_PATH', os.path.join(os.path.dirname(__file__), '../cache/notes_index.sqlite3'))
+MAX_INDEXED_CHARS = int(os.getenv('NOTES_INDEX_MAX_CHARS', 500000))
+CHUNK_CHARS = 1000
+CHUNK_OVERLAP = 200
+
+STOPWORDS = {
+    'the', 'and', 'for', 'are', 'what', 'which', 'with', 'this', 'that', 'from', 'about', 'explain',
+    'notes', 'note', 'module', 'please', 'can', 'you', 'give', 'tell', 'how', 'why', 'does', 'into'
+}
+
+_local = threading.local()
+_jobs = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        conn = sqlite3.connect(INDEX_PATH, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS note_chunks USING fts5('
+            'text, note_id UNINDEXED, departmentcode UNINDEXED, semester UNINDEXED, '
+            'filename UNINDEXED, chunk_number UNINDEXED, tokenize="porter unicode61")'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS indexed_notes ('
+            'note_id INTEGER PRIMARY KEY, content_hash TEXT, chunk_count INTEGER NOT NULL, indexed_at REAL NOT NULL)'
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def chunk_text(text):
+    """Split text into ~CHUNK_CHARS pieces on word boundaries, overlapping by CHUNK_OVERLAP."""
+    text = ' '.join(text.split())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + CHUNK_CHARS, len(text))
+        if end < len(text):
+            space = text.rfind(' ', start + CHUNK_OVERLAP, end)
+            end = space if space > start else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = text.find(' ', end - CHUNK_OVERLAP, end)
+        start = next_start + 1 if next_start > start else end
+    return chunks
+
+def index_note(note_id, file_path, departmentcode, semester, filename, content_hash=None):
+    """Extract a note and replace its chunks in the index. Returns the chunk count."""
+    conn = _connection()
+    indexed = conn.execute('SELECT content_hash FROM indexed_notes WHERE note_id = ?', (note_id,)).fetchone()
+    if indexed and content_hash and indexed[0] == content_hash:
+        return None
+
+    with open(file_path, 'rb') as f:
+        extraction = extract_text(f.read(), MAX_INDEXED_CHARS)
+    chunks = chunk_text(extraction.text)
+    with conn:
+        conn.execute('DELETE FROM note_chunks WHERE note_id = ?', (note_id,))
+        conn.executemany(
+            'INSERT INTO note_chunks (text, note_id, departmentcode, semester, filename, chunk_number) VALUES (?, ?, ?, ?, ?, ?)',
+            [(chunk, note_id, departmentcode, semester, filename, number) for number, chunk in enumerate(chunks)]
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO indexed_notes (note_id, content_hash, chunk_count, indexed_at) VALUES (?, ?, ?, ?)',
+            (note_id, content_hash, len(chunks), time.time())
+        )
+    metrics.increment('notes_index.notes_indexed')
+    logger.info(f"Indexed note {note_id} ({filename}): {len(chunks)} chunks from {extraction.pages_parsed} pages in {extraction.elapsed:.2f}s")
+    return len(chunks)
+
+def remove_notes(note_ids):
+    conn = _connection()
+    with conn:
+        for note_id in note_ids:
+            conn.execute('DELETE FROM note_chunks WHERE note_id = ?', (note_id,))
+            conn.execute('DELETE FROM indexed_notes WHERE note_id = ?', (note_id,))
+    metrics.increment('notes_index.notes_removed', len(note_ids))
+
+def indexed_note_ids():
+    return {note_id for (note_id,) in _connection().execute('SELECT note_id FROM indexed_notes')}
+
+def clear():
+    conn = _connection()
+    with conn:
+        conn.execute('DELETE FROM note_chunks')
+        conn.execute('DELETE FROM indexed_notes')
+
+def search(query, departmentcode, semester=None, limit=5):
+    """
+    Top ``limit`` chunks for ``query`` by BM25 within a department (and
+    semester, when given). Each hit is a dict with note_id, filename, text and
+    score (lower is better, as returned by FTS5).
+    """
+    match = _match_expression(query)
+    if not match:
+        return []
+    sql = (
+        'SELECT note_id, filename, text, bm25(note_chunks) AS score FROM note_chunks '
+        'WHERE note_chunks MATCH ? AND departmentcode = ?'
+    )
+    params = [match, departmentcode]
+    if semester:
+        sql += ' AND semester = ?'
+        params.append(semester)
+    sql += ' ORDER BY score LIMIT ?'
+    params.append(limit)
+    try:
+        rows = _connection().execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Notes index search failed: {str(e)}")
+        metrics.increment('notes_index.errors')
+        return []
+    metrics.increment('notes_index.searches')
+    return [{'note_id': note_id, 'filename': filename, 'text': text, 'score': score} for note_id, filename, text, score in rows]
+
+def _match_expression(query):
+    """OR of the query's meaningful words, each quoted so FTS5 syntax in user input is inert."""
+    words = []
+    for word in re.findall(r'\w+', query.lower()):
+        if len(word) >= 3 and word not in STOPWORDS and not re.fullmatch(r's\d', word) and word not in words:
+            words.append(word)
+    return ' OR '.join(f'"{word}"' for word in words)
+
+def schedule_indexing(note_id, file_path, departmentcode, semester, filename, content_hash=None):
+    """Queue a committed note for background indexing."""
+    _ensure_worker()
+    _jobs.put(('index', (note_id, file_path, departmentcode, semester, filename, content_hash)))
+
+def schedule_removal(note_ids):
+    """Queue deleted notes for removal from the index once their rows have committed."""
+    note_ids = [note_id for note_id in note_ids if note_id is not None]
+    if note_ids:
+        _ensure_worker()
+        _jobs.put(('remove', (note_ids,)))
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_jobs, name='notes-indexer', daemon=True)
+            _worker.start()
+
+def _run_jobs():
+    while True:
+        action, args = _jobs.get()
+        try:
+            if action == 'index':
+                index_note(*args)
+            else:
+                remove_notes(*args)
+        except Exception as e:
+            logger.error(f"Notes indexer failed to {action} {args[0]}: {str(e)}")
+            metrics.increment('notes_index.errors')
+        finally:
+            _jobs.task_done()
@@ -0,0 +1,38 @@
+# utils/offload.py
+"""
+Run blocking work (SQLAlchemy queries, file reads, PDF parsing) from async
+views without stalling their event loop.
+
+Calls run on a process-wide thread pool. Flask gives every async view a new
+event loop, so the loop's default executor would start fresh threads per
+request; the shared pool keeps its threads (and their thread-local SQLite
+connections) warm. Each call gets a fresh app context and with it its own
+scoped db.session, removed again when the context pops, so the request's
+session is never shared across threads.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+OFFLOAD_WORKERS = int(os.getenv('OFFLOAD_WORKERS', 16))
+
+_executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix='offload')
+
+async def run_blocking(func, *args):
+    """Await ``func(*args)`` executed on a pool thread inside an app context."""
+    app = current_app._get_current_object()
+
+    def call():
+        with app.app_context():
+            return func(*args)
+
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+def submit(func, *args):
+    """Start ``func(*args)`` on the pool without an app context; returns a concurrent.futures.Future."""
+    return _executor.submit(func, *args)
+
+async def resolved(value=None):
+    """An awaitable that yields ``value``, for optional branches of asyncio.gather."""
+    return value
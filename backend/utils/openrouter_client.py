@@ -0,0 +1,177 @@
+# utils/openrouter_client.py
+"""
+Long-lived HTTP client for OpenRouter, one per worker process.
+
+Flask runs every async view in a fresh event loop, so an aiohttp session
+cannot simply be kept between requests. Instead the client owns a background
+thread running its own event loop; the ClientSession, its keep-alive
+connection pool, the DNS cache and the SSL context live on that loop.
+Request handlers hand coroutines to it and await the result from their own
+loop, so TCP and TLS connections are reused across chat turns.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import queue
+import ssl
+import threading
+import time
+import aiohttp
+import certifi
+
+logger = logging.getLogger(__name__)
+
+# Point OPENROUTER_BASE_URL at mock_openrouter.py to run without the paid API
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+OPENROUTER_URL = f"{OPENROUTER_BASE_URL}/chat/completions"
+
+POOL_LIMIT = int(os.getenv('OPENROUTER_POOL_LIMIT', 100))
+POOL_LIMIT_PER_HOST = int(os.getenv('OPENROUTER_POOL_LIMIT_PER_HOST', 20))
+DNS_TTL = int(os.getenv('OPENROUTER_DNS_TTL', 300))
+KEEPALIVE_TIMEOUT = float(os.getenv('OPENROUTER_KEEPALIVE_TIMEOUT', 30))
+REQUEST_TIMEOUT = float(os.getenv('OPENROUTER_TIMEOUT', 15))
+
+_STREAM_END = object()
+
+class OpenRouterClient:
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._session = None
+        self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self._thread = threading.Thread(target=self._run_loop, name='openrouter-client', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _get_session(self):
+        # Only called on the client loop, so no locking is needed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self._ssl_context,
+                limit=POOL_LIMIT,
+                limit_per_host=POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+        return self._session
+
+    def submit(self, coro):
+        """Schedule a coroutine on the client loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def post_chat(self, payload, headers):
+        """POST a chat completion from any event loop and return the decoded JSON."""
+        return await asyncio.wrap_future(self.submit(self._post_chat(payload, headers)))
+
+    async def _post_chat(self, payload, headers):
+        session = self._get_session()
+        try:
+            start_time = time.perf_counter()
+            async with session.post(OPENROUTER_URL, headers=headers, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+                logger.info(f"OpenRouter API responded in {time.perf_counter() - start_time:.2f} seconds")
+                return data
+        except asyncio.TimeoutError:
+            logger.error(f"OpenRouter API request timed out after {REQUEST_TIMEOUT:g} seconds")
+            raise Exception("Sorry, the request took too long. Try again!")
+        except aiohttp.ClientError as e:
+            logger.error(f"OpenRouter API error: {str(e)}")
+            raise Exception(f"API request failed: {str(e)}")
+
+    def stream_chat(self, payload, headers):
+        """
+        Iterate (from a plain thread) over the content deltas of a streamed chat
+        completion. The HTTP response is read on the client loop and handed over
+        through a queue; closing the iterator early cancels the upstream read.
+        """
+        deltas = queue.Queue()
+        future = self.submit(self._stream_chat(dict(payload, stream=True), headers, deltas))
+        try:
+            while True:
+                item = deltas.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    async def _stream_chat(self, payload, headers, deltas):
+        session = self._get_session()
+        # Streams can legitimately outlast the total timeout; bound the gap between reads instead
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+        try:
+            async with session.post(OPENROUTER_URL, headers=headers, json=payload, timeout=timeout) as response:
+                response.raise_for_status()
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').strip()
+                    if not line.startswith('data:'):
+                        continue  # blank separators and ': OPENROUTER PROCESSING' keep-alives
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    event = json.loads(data)
+                    choice = (event.get('choices') or [{}])[0]
+                    if event.get('error') or choice.get('finish_reason') == 'error':
+                        # Mid-stream failures arrive as an event after the 200 status
+                        error = event.get('error') or {}
+                        message = error.get('message', 'unknown error') if isinstance(error, dict) else str(error)
+                        logger.error(f"OpenRouter stream failed mid-response: {message}")
+                        deltas.put(Exception(f"API request failed: {message}"))
+                        return
+                    delta = (choice.get('delta') or {}).get('content')
+                    if delta:
+                        deltas.put(delta)
+        except asyncio.TimeoutError:
+            logger.error(f"OpenRouter stream stalled for {REQUEST_TIMEOUT:g} seconds")
+            deltas.put(Exception("Sorry, the request took too long. Try again!"))
+        except aiohttp.ClientError as e:
+            logger.error(f"OpenRouter API error: {str(e)}")
+            deltas.put(Exception(f"API request failed: {str(e)}"))
+        except ValueError as e:
+            logger.error(f"Malformed OpenRouter stream event: {str(e)}")
+            deltas.put(Exception(f"API request failed: {str(e)}"))
+        except Exception as e:
+            # Anything else must still fail the stream, never end it as if complete
+            logger.error(f"OpenRouter stream error: {str(e)}", exc_info=True)
+            deltas.put(Exception(f"API request failed: {str(e)}"))
+        finally:
+            deltas.put(_STREAM_END)
+
+    def close(self):
+        """Close the session and stop the loop thread."""
+        if not self._loop.is_running():
+            return
+        if self._session is not None:
+            try:
+                self.submit(self._session.close()).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"Failed to close OpenRouter session cleanly: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The worker's shared client, created on first use (and again in a forked child)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = OpenRouterClient()
+            _client_pid = os.getpid()
+        return _client
+
+@atexit.register
+def close_client():
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
@@ -0,0 +1,66 @@
+# utils/pagination.py
+import base64
+import json
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(value):
+    """Encode the last key of a page as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def pagination_requested():
+    """True when the client asked for a paginated response (limit or cursor given)."""
+    return 'limit' in request.args or 'cursor' in request.args
+
+def apply_filters(query, model, allowed_filters):
+    """Apply equality filters from the query string for each allowed model column."""
+    for name in allowed_filters:
+        value = request.args.get(name)
+        if value:
+            query = query.filter(getattr(model, name) == value)
+    return query
+
+def paginate(query, key_column):
+    """
+    Keyset-paginate a query on a unique, indexed key column using request args.
+
+    Reads ``limit`` (default 50, max 500), ``cursor`` (the ``next_cursor`` of the
+    previous page) and ``count`` (set to ``false`` to skip the total count).
+    Returns ``(items, next_cursor, total)``; ``total`` is None when counting is off.
+    """
+    limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    if limit <= 0:
+        raise ValueError('limit must be a positive integer')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    total = None
+    if request.args.get('count', 'true').lower() not in ('false', '0', 'no'):
+        total = query.order_by(None).count()
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        query = query.filter(key_column > decode_cursor(cursor))
+
+    # Fetch one extra row to learn whether another page exists
+    items = query.order_by(key_column).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+    return items, next_cursor, total
+
+def page_response(items, next_cursor, total):
+    """Build the JSON body for a paginated list from model objects."""
+    body = {'items': [item.to_dict() for item in items], 'next_cursor': next_cursor}
+    if total is not None:
+        body['total'] = total
+    return body
@@ -0,0 +1,88 @@
+# utils/pdf_extract.py
+"""
+Budgeted PDF text extraction.
+
+Pages are parsed one at a time and extraction stops as soon as the character
+budget is met, so the cost follows ``max_chars`` rather than the page count.
+``page_range`` limits extraction to a 1-based inclusive span of pages, and
+``strategy`` picks the visiting order:
+
+* ``sequential``: pages in document order (the start of the notes).
+* ``spread``: the middle page first, then the middles of each half, and so on,
+  so whatever fits in the budget is drawn from across the whole range.
+
+Each page keeps only what still fits the budget when it is visited, and the
+kept text is returned in document order.
+"""
+import logging
+import time
+from collections import namedtuple
+from io import BytesIO
+from PyPDF2 import PdfReader
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('sequential', 'spread')
+
+PdfExtraction = namedtuple('PdfExtraction', ['text', 'pages_parsed', 'page_count', 'elapsed', 'complete'])
+
+def extract_text(file_data, max_chars=5000, page_range=None, strategy='sequential'):
+    """
+    Extract up to ``max_chars`` characters. ``complete`` is False when the
+    budget stopped extraction before every selected page was parsed.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown extraction strategy: {strategy}")
+
+    start_time = time.perf_counter()
+    pdf = PdfReader(BytesIO(file_data))
+    page_count = len(pdf.pages)
+    indices = _select_pages(page_count, page_range)
+    order = indices if strategy == 'sequential' else _spread_order(indices)
+
+    texts = {}
+    collected = 0
+    pages_parsed = 0
+    for index in order:
+        if collected >= max_chars:
+            break
+        pages_parsed += 1
+        try:
+            page_text = pdf.pages[index].extract_text() or ''
+        except Exception as e:
+            logger.warning(f"Skipping unreadable PDF page {index + 1}: {str(e)}")
+            continue
+        if page_text:
+            # Cut in visiting order, so with 'spread' the budget is shared across the range
+            texts[index] = page_text[:max_chars - collected]
+            collected += len(texts[index]) + 1
+
+    text = " ".join(texts[index] for index in sorted(texts))
+    elapsed = time.perf_counter() - start_time
+    metrics.increment('pdf_extract.documents')
+    metrics.increment('pdf_extract.pages_parsed', pages_parsed)
+    return PdfExtraction(text, pages_parsed, page_count, elapsed, pages_parsed == len(indices))
+
+def _select_pages(page_count, page_range):
+    if page_range is None:
+        return list(range(page_count))
+    first, last = page_range
+    first = max(int(first), 1)
+    last = min(int(last), page_count)
+    return list(range(first - 1, last))
+
+def _spread_order(indices):
+    """Breadth-first bisection of ``indices``: every prefix covers the range evenly."""
+    order = []
+    spans = [(0, len(indices))]
+    while spans:
+        next_spans = []
+        for low, high in spans:
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            order.append(indices[middle])
+            next_spans.extend([(low, middle), (middle + 1, high)])
+        spans = next_spans
+    return order
@@ -0,0 +1,107 @@
+# utils/pdf_text_cache.py
+"""
+On-disk cache of text extracted from PDFs, keyed by the file's SHA-256 and
+the extractor version, so repeat questions about the same notes skip PyPDF2.
+
+Entries live in a small SQLite database as zlib-compressed text. Reads bump
+``last_used``; when the compressed total exceeds PDF_TEXT_CACHE_MAX_BYTES the
+least recently used entries are evicted.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv('PDF_TEXT_CACHE_PATH', os.path.join(os.path.dirname(__file__), '../cache/pdf_text.sqlite3'))
+MAX_BYTES = int(os.getenv('PDF_TEXT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+_local = threading.local()
+_evict_lock = threading.Lock()
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS pdf_text ('
+            'content_hash TEXT NOT NULL, extractor_version TEXT NOT NULL, '
+            'text BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, '
+            'PRIMARY KEY (content_hash, extractor_version))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_pdf_text_last_used ON pdf_text (last_used)')
+        _local.conn = conn
+    return conn
+
+def get(content_hash, extractor_version):
+    """Cached text for the PDF, or None on a miss. Cache failures count as misses."""
+    try:
+        conn = _connection()
+        row = conn.execute(
+            'SELECT text FROM pdf_text WHERE content_hash = ? AND extractor_version = ?',
+            (content_hash, extractor_version)
+        ).fetchone()
+        if row is None:
+            metrics.increment('pdf_text_cache.misses')
+            return None
+        conn.execute(
+            'UPDATE pdf_text SET last_used = ? WHERE content_hash = ? AND extractor_version = ?',
+            (time.time(), content_hash, extractor_version)
+        )
+        metrics.increment('pdf_text_cache.hits')
+        return zlib.decompress(row[0]).decode('utf-8')
+    except (sqlite3.Error, zlib.error) as e:
+        logger.error(f"PDF text cache read failed for {content_hash}: {str(e)}")
+        metrics.increment('pdf_text_cache.errors')
+        metrics.increment('pdf_text_cache.misses')
+        return None
+
+def put(content_hash, extractor_version, text):
+    """Store extracted text, then evict least recently used entries beyond MAX_BYTES."""
+    try:
+        compressed = zlib.compress(text.encode('utf-8'))
+        conn = _connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO pdf_text (content_hash, extractor_version, text, size, last_used) VALUES (?, ?, ?, ?, ?)',
+            (content_hash, extractor_version, compressed, len(compressed), time.time())
+        )
+        _evict(conn)
+    except sqlite3.Error as e:
+        logger.error(f"PDF text cache write failed for {content_hash}: {str(e)}")
+        metrics.increment('pdf_text_cache.errors')
+
+def _evict(conn):
+    with _evict_lock:
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pdf_text').fetchone()[0]
+        if total <= MAX_BYTES:
+            return
+        evicted = 0
+        for content_hash, extractor_version, size in conn.execute(
+            'SELECT content_hash, extractor_version, size FROM pdf_text ORDER BY last_used'
+        ).fetchall():
+            if total <= MAX_BYTES:
+                break
+            conn.execute(
+                'DELETE FROM pdf_text WHERE content_hash = ? AND extractor_version = ?',
+                (content_hash, extractor_version)
+            )
+            total -= size
+            evicted += 1
+        metrics.increment('pdf_text_cache.evictions', evicted)
+        logger.info(f"PDF text cache evicted {evicted} entries, {total} bytes remain")
+
+def stats():
+    """Entry count and compressed size of the cache."""
+    try:
+        entries, size = _connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdf_text').fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': MAX_BYTES}
+    except sqlite3.Error as e:
+        logger.error(f"PDF text cache stats failed: {str(e)}")
+        return {'error': str(e)}
@@ -0,0 +1,88 @@
+# utils/response_cache.py
+"""
+In-process cache of chatbot completions.
+
+Keys combine the normalized question, the model and generation settings, and
+a version of the data the prompt was built from (uploaded PDF hash, retrieved
+note text, database context). A change in any of those misses the cache, so
+entries never outlive their data; the TTL bounds staleness of everything else.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from utils import metrics
+
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', 600))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', 1000))
+
+class TTLCache:
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, max_entries, ttl, metric_prefix):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.metric_prefix = metric_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                metrics.increment(f'{self.metric_prefix}.hits')
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                metrics.increment(f'{self.metric_prefix}.expired')
+        metrics.increment(f'{self.metric_prefix}.misses')
+        return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            metrics.increment(f'{self.metric_prefix}.evictions', evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        counters = metrics.snapshot()
+        hits = counters.get(f'{self.metric_prefix}.hits', 0)
+        lookups = hits + counters.get(f'{self.metric_prefix}.misses', 0)
+        return {
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hit_rate': round(hits / lookups, 4) if lookups else None
+        }
+
+chat_cache = TTLCache(CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_TTL, 'chat_cache')
+
+def normalize_message(message):
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    return re.sub(r'\s+', ' ', (message or '').lower()).strip().rstrip('?!. ')
+
+def data_version(*parts):
+    """Short digest of the context a prompt was built from (None parts are skipped)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if part is not None:
+            digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def chat_cache_key(message, payload, version):
+    settings = {key: payload.get(key) for key in ('model', 'max_tokens', 'temperature')}
+    raw = json.dumps([normalize_message(message), settings, version], sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
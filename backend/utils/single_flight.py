@@ -0,0 +1,100 @@
+# utils/single_flight.py
+"""
+Coalescing of concurrent identical work ("single flight").
+
+The first caller for a key becomes the leader and does the work; callers that
+arrive while it is still running wait for the leader's result instead of
+repeating it. Flask runs each async view on its own event loop in its own
+thread, so the shared result is a concurrent.futures.Future: sync callers
+block on it and async callers await it through wait_shared(), which keeps a
+follower's cancellation from cancelling the future everyone else waits on.
+
+Nothing is remembered once the leader finishes; caching results is the job
+of the caller (e.g. utils.response_cache).
+"""
+import asyncio
+import concurrent.futures
+import threading
+from utils import metrics
+
+def _shared_error(error):
+    """
+    What followers see when the leader fails. Cancellation and other
+    BaseExceptions belong to the leader's task alone, so followers get an
+    ordinary error instead of a result-less success or a foreign cancellation.
+    """
+    if isinstance(error, Exception):
+        return error
+    return RuntimeError(f"The coalesced call was interrupted ({type(error).__name__})")
+
+async def wait_shared(future):
+    """
+    Await a shared concurrent.futures.Future. Cancelling the awaiting task
+    cancels only this wait: a bare asyncio.wrap_future would cancel the shared
+    future itself, failing the leader's _finish and every other follower.
+    """
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+class SingleFlight:
+    def __init__(self, metric_prefix):
+        self.metric_prefix = metric_prefix
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = concurrent.futures.Future()
+                leader = True
+            else:
+                leader = False
+        metrics.increment(f"{self.metric_prefix}.{'leaders' if leader else 'coalesced'}")
+        return future, leader
+
+    def _finish(self, key, future, result, error):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except concurrent.futures.InvalidStateError:
+            pass  # already settled (cancelled); the leader keeps its own result or error
+
+    def in_flight(self, key):
+        """The pending future for ``key``, or None when nothing is running."""
+        with self._lock:
+            return self._calls.get(key)
+
+    def run(self, key, fn):
+        """Call ``fn()`` unless a call for ``key`` is already running, then share its result."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        result, error = None, None
+        try:
+            result = fn()
+            return result
+        except BaseException as e:
+            error = _shared_error(e)
+            raise
+        finally:
+            self._finish(key, future, result, error)
+
+    async def run_async(self, key, coro_fn):
+        """Async counterpart of run(): ``coro_fn`` is a zero-argument coroutine function."""
+        future, leader = self._join(key)
+        if not leader:
+            return await wait_shared(future)
+        result, error = None, None
+        try:
+            result = await coro_fn()
+            return result
+        except BaseException as e:
+            error = _shared_error(e)
+            raise
+        finally:
+            self._finish(key, future, result, error)